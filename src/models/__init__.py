@@ -1,11 +1,22 @@
 """
 Pydantic models for menu items and restaurant data.
 """
-from pydantic import BaseModel, Field, validator
+import re
+import sys
+from dataclasses import dataclass
+from pydantic import BaseModel, Field, model_validator
 from typing import Literal, Optional, List
 from datetime import datetime
 
 
+_WS_RE = re.compile(r'\s+')
+
+# Raw tag -> normalized, interned tag. Tag vocabularies are small and repeat
+# across items, so items share one string object per tag
+_TAG_CACHE: dict = {}
+_TAG_CACHE_SIZE = 4096
+
+
 class MenuItem(BaseModel):
     """
     Core dish model - represents a single menu item.
@@ -41,24 +52,36 @@ class MenuItem(BaseModel):
         description="Dietary information (e.g., ['vegetarian', 'vegan', 'gluten-free', 'dairy-free'])"
     )
     
-    @validator('price')
-    def validate_price(cls, v):
-        """Ensure price is positive and rounded to 2 decimals"""
-        if v <= 0:
-            raise ValueError('Price must be > 0')
-        return round(float(v), 2)
-    
-    @validator('name')
-    def normalize_name(cls, v):
-        """Normalize whitespace in name"""
-        return ' '.join(v.split())
-    
-    @validator('tags', 'dietary_info')
-    def normalize_lists(cls, v):
-        """Normalize list fields - remove empty strings, lowercase tags"""
-        if v is None:
-            return []
-        return [item.strip().lower() for item in v if item.strip()]
+    @model_validator(mode='after')
+    def normalize(self) -> 'MenuItem':
+        """
+        Normalize fields in a single pass after core validation.
+        
+        - price: rounded to 2 decimals (positivity is enforced by the field constraint)
+        - name: whitespace collapsed
+        - tags/dietary_info: empty strings removed, lowercased
+        """
+        self.price = round(float(self.price), 2)
+        self.name = _WS_RE.sub(' ', self.name).strip()
+        self.tags = _normalize_list(self.tags)
+        self.dietary_info = _normalize_list(self.dietary_info)
+        return self
+
+
+def _normalize_list(values: Optional[List[str]]) -> List[str]:
+    """Normalize list fields - remove empty strings, lowercase tags"""
+    if values is None:
+        return []
+    normalized = []
+    for item in values:
+        tag = _TAG_CACHE.get(item)
+        if tag is None:
+            tag = sys.intern(item.strip().lower())
+            if len(_TAG_CACHE) < _TAG_CACHE_SIZE:
+                _TAG_CACHE[item] = tag
+        if tag:
+            normalized.append(tag)
+    return normalized
 
 
 class Menu(BaseModel):
@@ -75,3 +98,20 @@ class RestaurantMenu(BaseModel):
     extraction_date: datetime = Field(default_factory=datetime.utcnow)
     confidence_score: Optional[float] = Field(None, ge=0, le=1)
     menu: List[MenuItem] = Field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Restaurant:
+    """The fields of a scraped Places record that menu parsing uses"""
+    id: Optional[str]
+    name: str
+    website_uri: Optional[str]
+    
+    @classmethod
+    def from_place(cls, place: dict) -> "Restaurant":
+        """Extract the record from a Places API dict (as written by the scraper)"""
+        return cls(
+            id=place.get('place_id') or place.get('id'),
+            name=(place.get('displayName') or {}).get('text') or place.get('name', 'Unknown'),
+            website_uri=place.get('websiteUri'),
+        )
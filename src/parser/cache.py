@@ -1,12 +1,29 @@
 """
 Caching logic for menu data.
 """
-import json
+import asyncio
+import hashlib
 import os
+import time
+import orjson
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
-from ..models import RestaurantMenu
+from typing import Optional, Tuple
+from ..models import RestaurantMenu, MenuItem, Menu
+
+# In-process layer in front of the cache files
+MEMORY_CACHE_TTL_SECONDS = 300
+MEMORY_CACHE_MAX_ENTRIES = 1024
+
+# Bump when the Menu/MenuItem fields change so stale LLM responses are not reused
+LLM_CACHE_SCHEMA_VERSION = '1'
+
+# Discovered menu pages are reused across runs for this long
+DISCOVERY_CACHE_TTL_DAYS = 7
+
+# Set MENU_CACHE_PRETTY=1 to write indented cache files for debugging
+MENU_CACHE_PRETTY = os.getenv('MENU_CACHE_PRETTY', '').lower() in ('1', 'true', 'yes')
 
 
 class MenuCache:
@@ -16,56 +33,177 @@ class MenuCache:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_ttl_days = 30
+        # restaurant_id -> (time cached, menu), least recently used first
+        self._mem: OrderedDict = OrderedDict()
+        # Ids with a cache file, listed once so misses skip the file system
+        self._keys = {
+            entry.name[:-len('.json')]
+            for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith('.json')
+        }
     
     def get_cache_path(self, restaurant_id: str) -> Path:
         """Get cache file path for restaurant"""
         return self.cache_dir / f"{restaurant_id}.json"
     
-    def load(self, restaurant_id: str) -> Optional[RestaurantMenu]:
+    async def load(self, restaurant_id: str) -> Optional[RestaurantMenu]:
         """Load menu from cache if fresh"""
-        cache_path = self.get_cache_path(restaurant_id)
+        hit = self._mem.get(restaurant_id)
+        if hit and time.time() - hit[0] < MEMORY_CACHE_TTL_SECONDS:
+            self._mem.move_to_end(restaurant_id)
+            return hit[1]
         
-        if not cache_path.exists():
+        if restaurant_id not in self._keys:
             return None
+        cache_path = self.get_cache_path(restaurant_id)
         
         try:
-            with open(cache_path, 'r') as f:
-                data = json.load(f)
+            # File reads run in a worker thread so they don't stall the event loop;
+            # orjson also reads the older indented cache files written with stdlib json
+            data = orjson.loads(await asyncio.to_thread(cache_path.read_bytes))
             
             # Check if cache is fresh
             extraction_date = datetime.fromisoformat(data.get('extraction_date', ''))
             if datetime.utcnow() - extraction_date > timedelta(days=self.cache_ttl_days):
                 return None
             
-            return RestaurantMenu(**data)
+            # Trust boundary: cache files are only written by save() from menus that
+            # were already validated on ingest, so skip re-running validators here.
+            # Untrusted input (parser/LLM output) must go through RestaurantMenu(...).
+            items = [MenuItem.model_construct(**item) for item in data.get('menu', [])]
+            menu = RestaurantMenu.model_construct(**{
+                **data,
+                'menu': items,
+                'extraction_date': extraction_date,
+            })
+            self._remember(restaurant_id, menu)
+            return menu
             
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"Error loading cache for {restaurant_id}: {e}")
             return None
     
-    def save(self, menu: RestaurantMenu):
+    async def save(self, menu: RestaurantMenu):
         """Save menu to cache"""
         cache_path = self.get_cache_path(menu.restaurant_id)
         
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(menu.dict(), f, indent=2, default=str)
+            # Naive datetimes serialize as ISO strings without an offset, which is
+            # what load() expects when comparing against utcnow()
+            # model_dump_json serializes in pydantic-core without an intermediate dict
+            indent = 2 if MENU_CACHE_PRETTY else None
+            data = menu.model_dump_json(indent=indent).encode()
+            await asyncio.to_thread(cache_path.write_bytes, data)
+            self._keys.add(menu.restaurant_id)
+            self._remember(menu.restaurant_id, menu)
         except Exception as e:
             print(f"Error saving cache for {menu.restaurant_id}: {e}")
     
-    def is_cached(self, restaurant_id: str) -> bool:
-        """Check if restaurant menu is cached and fresh"""
-        cache_path = self.get_cache_path(restaurant_id)
-        
-        if not cache_path.exists():
-            return False
+    def _remember(self, restaurant_id: str, menu: RestaurantMenu):
+        """Store menu in the in-process LRU, evicting the least recently used entry"""
+        self._mem[restaurant_id] = (time.time(), menu)
+        self._mem.move_to_end(restaurant_id)
+        if len(self._mem) > MEMORY_CACHE_MAX_ENTRIES:
+            self._mem.popitem(last=False)
+
+
+class LLMResponseCache:
+    """Handle caching of LLM menu responses, keyed by model and prompt"""
+    
+    def __init__(self, cache_dir: str = "cache/llm"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def key(self, model: str, prompt: str) -> str:
+        """Build the cache key for a prompt sent to a model"""
+        raw = f"{LLM_CACHE_SCHEMA_VERSION}\0{model}\0{prompt}".encode()
+        return hashlib.blake2b(raw, digest_size=20).hexdigest()
+    
+    def get_cache_path(self, key: str) -> Path:
+        """Get cache file path for key"""
+        return self.cache_dir / f"{key}.json"
+    
+    async def get(self, key: str) -> Optional[Menu]:
+        """Load a cached response, or None on a miss"""
+        try:
+            data = await asyncio.to_thread(self.get_cache_path(key).read_bytes)
+            return Menu.model_validate_json(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading LLM cache entry {key}: {e}")
+            return None
+    
+    async def set(self, key: str, menu: Menu):
+        """Save a response to the cache"""
+        try:
+            await asyncio.to_thread(self.get_cache_path(key).write_bytes, menu.model_dump_json().encode())
+        except Exception as e:
+            print(f"Error saving LLM cache entry {key}: {e}")
+
+
+class DiscoveryCache:
+    """
+    Handle caching of menu discovery results, keyed by website URI.
+    
+    Each entry records the menu URL, its sniffed content type and the SHA-256
+    of its HTML. The HTML is stored once per hash, so websites that lead to
+    the same menu page share one file.
+    """
+    
+    def __init__(self, cache_dir: str = "cache/discovery"):
+        self.cache_dir = Path(cache_dir)
+        self.html_dir = self.cache_dir / "html"
+        self.html_dir.mkdir(parents=True, exist_ok=True)
+    
+    def get_cache_path(self, website_uri: str) -> Path:
+        """Get cache file path for a website"""
+        key = hashlib.blake2b(website_uri.encode(), digest_size=20).hexdigest()
+        return self.cache_dir / f"{key}.json"
+    
+    async def get(self, website_uri: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Load a fresh discovery result.
         
+        Returns:
+            Tuple of (menu_url, html_content, content_type), or None on a miss
+        """
         try:
-            with open(cache_path, 'r') as f:
-                data = json.load(f)
+            data = orjson.loads(await asyncio.to_thread(self.get_cache_path(website_uri).read_bytes))
+            if time.time() - data['cached_at'] > DISCOVERY_CACHE_TTL_DAYS * 86400:
+                return None
             
-            extraction_date = datetime.fromisoformat(data.get('extraction_date', ''))
-            return datetime.utcnow() - extraction_date <= timedelta(days=self.cache_ttl_days)
+            html_content = None
+            if data.get('content_sha'):
+                html_path = self.html_dir / f"{data['content_sha']}.html"
+                html_content = (await asyncio.to_thread(html_path.read_bytes)).decode('utf-8')
+            return data['menu_url'], html_content, data.get('content_type')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading discovery cache for {website_uri}: {e}")
+            return None
+    
+    async def set(self, website_uri: str, menu_url: str, html_content: Optional[str],
+                  content_type: Optional[str] = None):
+        """Save a discovery result to the cache"""
+        try:
+            content_sha = None
+            if html_content is not None:
+                html_bytes = html_content.encode('utf-8')
+                content_sha = hashlib.sha256(html_bytes).hexdigest()
+                html_path = self.html_dir / f"{content_sha}.html"
+                if not html_path.exists():
+                    await asyncio.to_thread(html_path.write_bytes, html_bytes)
             
-        except Exception:
-            return False
+            data = orjson.dumps({
+                'menu_url': menu_url,
+                'content_sha': content_sha,
+                'content_type': content_type,
+                'cached_at': time.time(),
+            })
+            await asyncio.to_thread(self.get_cache_path(website_uri).write_bytes, data)
+        except Exception as e:
+            print(f"Error saving discovery cache for {website_uri}: {e}")
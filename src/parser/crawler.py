@@ -0,0 +1,51 @@
+"""
+Shared Crawl4AI browser for menu discovery and HTML parsing.
+"""
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Optional
+from crawl4ai import AsyncWebCrawler
+
+# Maximum concurrent page loads on the shared browser
+CRAWLER_MAX_CONCURRENCY = 4
+
+_crawler: Optional[AsyncWebCrawler] = None
+_exit_stack: Optional[AsyncExitStack] = None
+_lock = asyncio.Lock()
+_semaphore = asyncio.Semaphore(CRAWLER_MAX_CONCURRENCY)
+
+
+async def get_crawler() -> AsyncWebCrawler:
+    """Get the process-wide crawler, starting the browser on first use"""
+    global _crawler, _exit_stack
+    async with _lock:
+        if _crawler is None:
+            _exit_stack = AsyncExitStack()
+            _crawler = await _exit_stack.enter_async_context(AsyncWebCrawler())
+    return _crawler
+
+
+async def crawl(url: str, **kwargs):
+    """
+    Run a page load on the shared crawler, bounded by CRAWLER_MAX_CONCURRENCY.
+    
+    Args:
+        url: Page URL
+        **kwargs: Arguments for AsyncWebCrawler.arun
+        
+    Returns:
+        Crawl4AI result
+    """
+    crawler = await get_crawler()
+    async with _semaphore:
+        return await crawler.arun(url=url, **kwargs)
+
+
+async def close_crawler():
+    """Shut down the shared browser if it was started"""
+    global _crawler, _exit_stack
+    async with _lock:
+        if _exit_stack is not None:
+            await _exit_stack.aclose()
+        _crawler = None
+        _exit_stack = None
@@ -5,6 +5,13 @@ import re
 from typing import Optional, Tuple
 from urllib.parse import urlparse
 import httpx
+from .menu_parsers.base import PDF_URL_RE
+
+
+# HTML indicators of hosted ordering platforms, matched case-insensitively
+_TOAST_INDICATOR_RE = re.compile(r'window\.toast|toast-menu|toasttab', re.IGNORECASE)
+_DOORDASH_INDICATOR_RE = re.compile(r'doordash', re.IGNORECASE)
+_PDF_HREF_RE = re.compile(r'href=["\']([^"\']*\.pdf[^"\']*)["\']', re.IGNORECASE)
 
 
 class FormatDetector:
@@ -43,13 +50,22 @@ class FormatDetector:
     ]
     
     def __init__(self):
-        self.toast_regex = re.compile('|'.join(self.TOAST_PATTERNS), re.IGNORECASE)
-        self.doordash_regex = re.compile('|'.join(self.DOORDASH_PATTERNS), re.IGNORECASE)
-        self.resy_regex = re.compile('|'.join(self.RESY_PATTERNS), re.IGNORECASE)
-        self.opentable_regex = re.compile('|'.join(self.OPENTABLE_PATTERNS), re.IGNORECASE)
-        self.grubhub_regex = re.compile('|'.join(self.GRUBHUB_PATTERNS), re.IGNORECASE)
-        self.chownow_regex = re.compile('|'.join(self.CHOWNOW_PATTERNS), re.IGNORECASE)
-        self.square_regex = re.compile('|'.join(self.SQUARE_PATTERNS), re.IGNORECASE)
+        # One compiled alternation per platform, checked in this order: a URL
+        # can mention several platforms (e.g. a toasttab link with
+        # ?ref=squarespace), and the earlier platform wins
+        platforms = {
+            'toast': self.TOAST_PATTERNS,
+            'doordash': self.DOORDASH_PATTERNS,
+            'resy': self.RESY_PATTERNS,
+            'opentable': self.OPENTABLE_PATTERNS,
+            'grubhub': self.GRUBHUB_PATTERNS,
+            'chownow': self.CHOWNOW_PATTERNS,
+            'square': self.SQUARE_PATTERNS,
+        }
+        self._platform_regexes = [
+            (name, re.compile('|'.join(patterns), re.IGNORECASE))
+            for name, patterns in platforms.items()
+        ]
     
     def detect_format(self, url: str, html_content: Optional[str] = None) -> Tuple[str, Optional[str]]:
         """
@@ -74,49 +90,33 @@ class FormatDetector:
     
     def detect_platform(self, url: str, html_content: Optional[str] = None) -> Optional[str]:
         """Detect specific platform from URL or HTML"""
-        if self.toast_regex.search(url) or (html_content and self._has_toast_indicators(html_content)):
-            return 'toast'
-        if self.doordash_regex.search(url) or (html_content and self._has_doordash_indicators(html_content)):
-            return 'doordash'
-        if self.resy_regex.search(url):
-            return 'resy'
-        if self.opentable_regex.search(url):
-            return 'opentable'
-        if self.grubhub_regex.search(url):
-            return 'grubhub'
-        if self.chownow_regex.search(url):
-            return 'chownow'
-        if self.square_regex.search(url):
-            return 'square'
+        # HTML indicators only apply to Toast/DoorDash and keep their precedence
+        html_indicators = {
+            'toast': self._has_toast_indicators,
+            'doordash': self._has_doordash_indicators,
+        }
+        for name, regex in self._platform_regexes:
+            if regex.search(url):
+                return name
+            if html_content and name in html_indicators and html_indicators[name](html_content):
+                return name
         return None
     
     def _is_pdf_url(self, url: str) -> bool:
-        """Check if URL points to a PDF"""
-        return url.lower().endswith('.pdf') or '.pdf' in url.lower()
+        """Check if URL points to a PDF (same test as classify_url)"""
+        return bool(PDF_URL_RE.search(url))
     
     def _has_pdf_links(self, html_content: str) -> bool:
         """Check if HTML contains PDF links"""
-        pdf_pattern = re.compile(r'href=["\']([^"\']*\.pdf[^"\']*)["\']', re.IGNORECASE)
-        return bool(pdf_pattern.search(html_content))
+        return bool(_PDF_HREF_RE.search(html_content))
     
     def _has_toast_indicators(self, html_content: str) -> bool:
         """Check for Toast platform indicators in HTML"""
-        indicators = [
-            'window.toast',
-            'toast-menu',
-            'toasttab',
-        ]
-        html_lower = html_content.lower()
-        return any(indicator.lower() in html_lower for indicator in indicators)
+        return bool(_TOAST_INDICATOR_RE.search(html_content))
     
     def _has_doordash_indicators(self, html_content: str) -> bool:
-        """Check for DoorDash platform indicators in HTML"""
-        indicators = [
-            'doordash',
-            'doordash-menu',
-        ]
-        html_lower = html_content.lower()
-        return any(indicator.lower() in html_lower for indicator in indicators)
+        """Check for DoorDash platform indicators in HTML ('doordash-menu' is covered by 'doordash')"""
+        return bool(_DOORDASH_INDICATOR_RE.search(html_content))
 
 
 async def fetch_html(url: str) -> Optional[str]:
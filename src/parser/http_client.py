@@ -0,0 +1,28 @@
+"""
+Shared HTTP client for downloading menu PDFs and images.
+"""
+from typing import Optional
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client if it was created"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -2,24 +2,97 @@
 Menu discovery and navigation - finds menu content on restaurant websites.
 Handles simple links, button clicking, and image-based menus.
 """
-from typing import Optional, List, Tuple
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
 import httpx
-from bs4 import BeautifulSoup
+import lxml.html
 import re
 from urllib.parse import urljoin, urlparse
-from crawl4ai import AsyncWebCrawler
+from .cache import DiscoveryCache
+from .crawler import crawl
+from .menu_parsers.base import PDF_URL_RE, SNIFF_BYTES, sniff_content_type
+
+
+# Menu keywords, price pattern and schema.org markers, each scanned in one pass
+_MENU_KEYWORD_RE = re.compile(r'menu|appetizer|entree|dessert|drink|price|\$')
+_PRICE_RE = re.compile(r'\$?\d+\.?\d{0,2}')
+_STRUCTURED_MENU_RE = re.compile(r'schema\.org/menu', re.IGNORECASE)  # also covers schema.org/menuitem
+
+# Keyword/price indicators almost always appear early; scan this many characters first
+MENU_SCAN_PREFIX = 262144
+_MENU_BUTTON_RE = re.compile(r'menu|order', re.IGNORECASE)
+_LINK_KEYWORD_RE = re.compile(r'menu|order', re.IGNORECASE)
+
+# Maximum number of candidate menu pages fetched concurrently
+MAX_PROBE = 4
+
+# Sniffed content types remembered for routing (most recent URLs)
+CONTENT_TYPE_CACHE_SIZE = 1024
 
 
 class MenuDiscovery:
     """Discovers and navigates to menu content on restaurant websites"""
     
     def __init__(self):
-        pass
+        # Shared across calls so the connection pool stays warm; created lazily
+        # and released by aclose()
+        self._client: Optional[httpx.AsyncClient] = None
+        # url -> 'pdf' or 'image', for fetched URLs whose body wasn't HTML
+        self._content_types: OrderedDict = OrderedDict()
+        # entrypoint -> discovery in progress, shared by concurrent callers
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.cache = DiscoveryCache()
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                follow_redirects=True,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=64),
+            )
+        return self._client
+    
+    def content_type(self, url: str) -> Optional[str]:
+        """
+        Get the sniffed content type of a returned menu URL.
+        
+        Returns:
+            'pdf' or 'image' if the URL was fetched and its body was one,
+            otherwise None (route by URL)
+        """
+        return self._content_types.get(url)
+    
+    def _sniff_binary(self, url: str, response: httpx.Response) -> bool:
+        """Check a response's magic bytes; remember and report PDF/image bodies"""
+        content_type = sniff_content_type(response.content[:SNIFF_BYTES])
+        if content_type == 'html':
+            return False
+        self._remember_content_type(url, content_type)
+        return True
+    
+    def _remember_content_type(self, url: str, content_type: str):
+        """Store a URL's content type, evicting the least recently used entry"""
+        self._content_types[url] = content_type
+        self._content_types.move_to_end(url)
+        if len(self._content_types) > CONTENT_TYPE_CACHE_SIZE:
+            self._content_types.popitem(last=False)
+    
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def get_menu_content(self, entrypoint_url: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Get menu URL and HTML content, handling links, button clicks, and images.
         
+        Concurrent calls for the same website share one discovery, and found
+        menus are cached on disk (see DiscoveryCache) for later runs.
+        
         Args:
             entrypoint_url: Restaurant website entrypoint
             
@@ -29,114 +102,191 @@ class MenuDiscovery:
             For HTML: (html_url, html_content)
             For images: (image_url, None) - Will be handled by vision API
         """
+        task = self._in_flight.get(entrypoint_url)
+        if task is None:
+            task = asyncio.create_task(self._get_menu_content_cached(entrypoint_url))
+            self._in_flight[entrypoint_url] = task
+            # Only in-flight discoveries are kept; finished ones are on disk
+            task.add_done_callback(lambda _: self._in_flight.pop(entrypoint_url, None))
+        # Shielded so one cancelled caller doesn't cancel the others' discovery
+        return await asyncio.shield(task)
+    
+    async def _get_menu_content_cached(self, entrypoint_url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Get menu content from the discovery cache, discovering and caching it on a miss"""
+        cached = await self.cache.get(entrypoint_url)
+        if cached:
+            menu_url, html_content, content_type = cached
+            if content_type:
+                self._remember_content_type(menu_url, content_type)
+            return menu_url, html_content
+        
+        menu_url, html_content = await self._discover_menu_content(entrypoint_url)
+        # Failures aren't cached; they may be transient
+        if menu_url:
+            await self.cache.set(entrypoint_url, menu_url, html_content, self._content_types.get(menu_url))
+        return menu_url, html_content
+    
+    async def _discover_menu_content(self, entrypoint_url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Find the menu URL and HTML content for a website (see get_menu_content)"""
         try:
             # First, try simple HTTP approach (fastest)
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                response = await client.get(entrypoint_url)
-                response.raise_for_status()
-                html_content = response.text
-                
-                if not html_content:
-                    return None, None
-                
-                # Check if current page already has menu content
-                if self._has_menu_content(html_content):
-                    # Check if menu is in an image
-                    image_url = self._find_menu_image(html_content, entrypoint_url)
-                    if image_url:
-                        return image_url, None
-                    return entrypoint_url, html_content
-                
-                # Extract and prioritize menu links
-                menu_urls = self._extract_menu_links(html_content, entrypoint_url)
-                
-                # Try each menu URL found (prioritized by link text)
-                for menu_url in menu_urls:
-                    try:
-                        # Handle PDFs
-                        if menu_url.lower().endswith('.pdf'):
-                            return menu_url, None
-                        
-                        # Fetch and check HTML content
-                        menu_response = await client.get(menu_url, timeout=30.0)
-                        menu_response.raise_for_status()
-                        menu_html = menu_response.text
-                        
-                        if menu_html and self._has_menu_content(menu_html):
-                            # Check if menu is in an image on this page
-                            image_url = self._find_menu_image(menu_html, menu_url)
-                            if image_url:
-                                return image_url, None
-                            return menu_url, menu_html
-                    except:
-                        continue
-                
-                # If simple HTTP didn't work, try browser automation for button clicking
-                return await self._try_browser_automation(entrypoint_url)
-                
+            client = self._get_client()
+            response = await client.get(entrypoint_url)
+            response.raise_for_status()
+            
+            # PDFs/images served without a file extension go to the vision parsers
+            if self._sniff_binary(entrypoint_url, response):
+                return entrypoint_url, None
+            html_content = response.text
+            
+            if not html_content:
+                return None, None
+            
+            # Parse once; the tree is shared by image and link extraction
+            doc = self._parse_html(html_content)
+            
+            # Check if current page already has menu content
+            if self._has_menu_content(html_content):
+                # Check if menu is in an image
+                image_url = self._find_menu_image(doc, entrypoint_url)
+                if image_url:
+                    return image_url, None
+                return entrypoint_url, html_content
+            
+            # Extract and prioritize menu links
+            menu_urls = self._extract_menu_links(doc, entrypoint_url)
+            
+            # Try each menu URL found (prioritized by link text). PDFs are
+            # returned without fetching, so only links ranked ahead of the
+            # first PDF need probing
+            pdf_index = next(
+                (i for i, url in enumerate(menu_urls) if PDF_URL_RE.search(url)),
+                len(menu_urls)
+            )
+            result = await self._probe_menu_urls(client, menu_urls[:pdf_index])
+            if result:
+                return result
+            if pdf_index < len(menu_urls):
+                return menu_urls[pdf_index], None
+            
+            # If simple HTTP didn't work, try browser automation for button clicking
+            return await self._try_browser_automation(entrypoint_url)
+            
         except Exception as e:
             print(f"Error discovering menu content for {entrypoint_url}: {e}")
             return None, None
     
+    async def _probe_menu_urls(self, client: httpx.AsyncClient,
+                               menu_urls: List[str]) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Fetch candidate menu pages concurrently, MAX_PROBE at a time.
+        Results are taken in priority order; once one succeeds the rest are cancelled.
+        """
+        for start in range(0, len(menu_urls), MAX_PROBE):
+            tasks = [
+                asyncio.create_task(self._probe(client, menu_url))
+                for menu_url in menu_urls[start:start + MAX_PROBE]
+            ]
+            try:
+                for task in tasks:
+                    result = await task
+                    if result:
+                        return result
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return None
+    
+    async def _probe(self, client: httpx.AsyncClient, menu_url: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Fetch a candidate menu page and check it for menu content"""
+        try:
+            menu_response = await client.get(menu_url, timeout=30.0)
+            menu_response.raise_for_status()
+            
+            # A menu link may serve a PDF/image from a URL without an extension
+            if self._sniff_binary(menu_url, menu_response):
+                return menu_url, None
+            menu_html = menu_response.text
+            
+            if menu_html and self._has_menu_content(menu_html):
+                # Check if menu is in an image on this page
+                image_url = self._find_menu_image(self._parse_html(menu_html), menu_url)
+                if image_url:
+                    return image_url, None
+                return menu_url, menu_html
+        except Exception:
+            pass
+        return None
+    
     async def _try_browser_automation(self, entrypoint_url: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Use browser automation to handle JavaScript-rendered menus and button clicks.
         """
         try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(url=entrypoint_url, bypass_cache=True)
-                
-                if not result or not result.html:
-                    return None, None
-                
-                # Check if we now have menu content after JavaScript execution
-                if self._has_menu_content(result.html):
-                    # Check for menu images
-                    image_url = self._find_menu_image(result.html, entrypoint_url)
-                    if image_url:
-                        return image_url, None
-                    return entrypoint_url, result.html
-                
-                # Try to find and click menu buttons
-                # Look for buttons/links with menu-related text
-                soup = BeautifulSoup(result.html, 'html.parser')
-                menu_buttons = soup.find_all(['button', 'a', 'div'], 
-                                             string=re.compile(r'menu|order', re.IGNORECASE))
-                
-                # If we found menu buttons but no content, the page might need interaction
-                # For now, return the page content - Crawl4AI should have executed JS
-                # In the future, we could add explicit button clicking here
+            result = await crawl(entrypoint_url, bypass_cache=True)
+            
+            if not result or not result.html:
+                return None, None
+            
+            doc = self._parse_html(result.html)
+            
+            # Check if we now have menu content after JavaScript execution
+            if self._has_menu_content(result.html):
+                # Check for menu images
+                image_url = self._find_menu_image(doc, entrypoint_url)
+                if image_url:
+                    return image_url, None
                 return entrypoint_url, result.html
-                
+            
+            # Try to find and click menu buttons
+            # Look for buttons/links with menu-related text
+            menu_buttons = [el for el in doc.iter('button', 'a', 'div')
+                            if el.text and _MENU_BUTTON_RE.search(el.text)]
+            
+            # If we found menu buttons but no content, the page might need interaction
+            # For now, return the page content - Crawl4AI should have executed JS
+            # In the future, we could add explicit button clicking here
+            return entrypoint_url, result.html
+            
         except Exception as e:
             print(f"Error in browser automation for {entrypoint_url}: {e}")
             return None, None
     
-    def _extract_menu_links(self, html_content: str, base_url: str) -> List[str]:
+    def _parse_html(self, html_content: str) -> lxml.html.HtmlElement:
+        """Parse HTML into an lxml tree (C parser, built once per page)"""
+        try:
+            return lxml.html.fromstring(html_content)
+        except ValueError:
+            # lxml rejects str input that carries an XML encoding declaration
+            return lxml.html.fromstring(html_content.encode('utf-8'))
+    
+    def _extract_menu_links(self, doc: lxml.html.HtmlElement, base_url: str) -> List[str]:
         """
-        Extract menu-related links from HTML, prioritized by link text.
+        Extract menu-related links from a parsed page, prioritized by link text.
         Priority: "menu" > "order" > PDF links (all PDFs included)
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
         priority_links = []  # Links with "menu" or "order" text
         pdf_links = []       # All PDF links (may be menus)
+        seen_priority = set()
+        seen_pdf = set()
         
-        for link in soup.find_all('a', href=True):
+        for link in doc.xpath('//a[@href]'):
             href = link.get('href', '').strip()
             if not href or href.startswith('#'):
                 continue
                 
-            link_text = link.get_text(strip=True).lower()
-            full_url = urljoin(base_url, href)
-            
             # Priority 1: Links with "menu" or "order" text
-            if 'menu' in link_text or 'order' in link_text:
-                if full_url not in priority_links:
+            if _LINK_KEYWORD_RE.search(link.text_content()):
+                full_url = urljoin(base_url, href)
+                if full_url not in seen_priority:
+                    seen_priority.add(full_url)
                     priority_links.append(full_url)
             
             # Priority 2: All PDF links (many menus are PDFs without "menu" in filename)
-            elif href.lower().endswith('.pdf'):
-                if full_url not in pdf_links:
+            elif PDF_URL_RE.search(href):
+                full_url = urljoin(base_url, href)
+                if full_url not in seen_pdf:
+                    seen_pdf.add(full_url)
                     pdf_links.append(full_url)
         
         # Return prioritized list: menu/order links first, then all PDFs
@@ -144,69 +294,69 @@ class MenuDiscovery:
     
     def _has_menu_content(self, html_content: str) -> bool:
         """Check if HTML content appears to contain menu items"""
-        html_lower = html_content.lower()
-        
-        # Check for menu indicators
-        menu_keywords = ['menu', 'appetizer', 'entree', 'dessert', 'drink', 'price', '$']
-        has_keywords = any(keyword in html_lower for keyword in menu_keywords)
-        
-        # Check for price patterns
-        has_prices = bool(re.search(r'\$?\d+\.?\d{0,2}', html_content))
+        # Need at least keywords + prices, or structured data. Scan a prefix
+        # first and only scan the whole page if it has no indicators. Script
+        # content is scanned too: some menus exist only as inline JSON (e.g.
+        # Next.js __NEXT_DATA__ or embedded ordering widgets)
+        if self._has_menu_indicators(html_content[:MENU_SCAN_PREFIX]):
+            return True
+        if len(html_content) > MENU_SCAN_PREFIX and self._has_menu_indicators(html_content):
+            return True
         
         # Check for structured menu data
-        has_structured_data = 'schema.org/menuitem' in html_lower or 'schema.org/menu' in html_lower
-        
-        # Need at least keywords + prices, or structured data
-        return (has_keywords and has_prices) or has_structured_data
+        return bool(_STRUCTURED_MENU_RE.search(html_content))
     
-    def _find_menu_image(self, html_content: str, base_url: str) -> Optional[str]:
+    def _has_menu_indicators(self, text: str) -> bool:
+        """Check text for menu keywords together with prices"""
+        return bool(_MENU_KEYWORD_RE.search(text.lower()) and _PRICE_RE.search(text))
+    
+    def _find_menu_image(self, doc: lxml.html.HtmlElement, base_url: str) -> Optional[str]:
         """
-        Find menu images in HTML content.
+        Find menu images in a parsed page.
         Looks for images near menu-related text or with menu-related alt text.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # Lowered parent text, computed once per parent and shared by sibling images
+        parent_texts = {}
+        
+        def parent_text_lower(parent):
+            if parent not in parent_texts:
+                parent_texts[parent] = parent.text_content().lower()
+            return parent_texts[parent]
         
-        # Find images with menu-related alt text or near menu text
-        for img in soup.find_all('img'):
+        # Single pass over the images; a large image near menu context is only
+        # a fallback, used when no image matches on alt or parent text
+        large_image_url = None
+        for img in doc.xpath('//img[@src]'):
             src = img.get('src', '')
-            alt = img.get('alt', '').lower()
-            
             if not src:
                 continue
             
             # Check alt text for menu keywords
+            alt = img.get('alt', '').lower()
             if any(keyword in alt for keyword in ['menu', 'dinner', 'lunch', 'brunch', 'breakfast']):
-                full_url = urljoin(base_url, src)
-                return full_url
+                return urljoin(base_url, src)
+            
+            parent = img.getparent()
+            if parent is None:
+                continue
+            parent_text = parent_text_lower(parent)
             
             # Check if image is near menu-related text
-            parent = img.find_parent()
-            if parent:
-                parent_text = parent.get_text().lower()
-                if any(keyword in parent_text for keyword in ['menu', 'dinner menu', 'lunch menu']):
-                    full_url = urljoin(base_url, src)
-                    return full_url
-        
-        # Also check for large images that might be menus
-        # (heuristic: images > 500px width/height are often menus)
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            width = img.get('width', '')
-            height = img.get('height', '')
-            
-            if src and (width or height):
-                try:
-                    w = int(width) if width else 0
-                    h = int(height) if height else 0
-                    if w > 500 or h > 500:
-                        # Check if it's near menu context
-                        parent = img.find_parent()
-                        if parent:
-                            parent_text = parent.get_text().lower()
-                            if 'menu' in parent_text or 'dinner' in parent_text or 'lunch' in parent_text:
-                                full_url = urljoin(base_url, src)
-                                return full_url
-                except:
-                    pass
+            if any(keyword in parent_text for keyword in ['menu', 'dinner menu', 'lunch menu']):
+                return urljoin(base_url, src)
+            
+            # Also check for large images that might be menus
+            # (heuristic: images > 500px width/height are often menus)
+            if large_image_url is None:
+                width = img.get('width', '')
+                height = img.get('height', '')
+                if width or height:
+                    try:
+                        w = int(width) if width else 0
+                        h = int(height) if height else 0
+                        if (w > 500 or h > 500) and ('dinner' in parent_text or 'lunch' in parent_text):
+                            large_image_url = urljoin(base_url, src)
+                    except ValueError:
+                        pass
         
-        return None
+        return large_image_url
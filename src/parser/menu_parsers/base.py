@@ -1,10 +1,59 @@
 """
 Base parser class for menu extraction.
 """
+import re
 from abc import ABC, abstractmethod
 from typing import List, Optional
 from ...models import MenuItem
 
+# URL type checks shared by the parsers and the factory, each a single regex scan
+# instead of lowercasing the URL and testing every extension
+PDF_URL_RE = re.compile(r'\.pdf(?:$|[?#])', re.IGNORECASE)
+IMAGE_URL_RE = re.compile(r'\.(?:jpe?g|png|gif|webp|bmp)(?:$|[?#])', re.IGNORECASE)
+
+# Bytes of a response body that sniff_content_type looks at
+SNIFF_BYTES = 1024
+
+
+def classify_url(url: str) -> str:
+    """
+    Classify a URL by its file extension.
+    
+    Args:
+        url: Menu or website URL
+        
+    Returns:
+        'pdf', 'image' or 'html' (anything without a PDF or image extension)
+    """
+    if PDF_URL_RE.search(url):
+        return 'pdf'
+    if IMAGE_URL_RE.search(url):
+        return 'image'
+    return 'html'
+
+
+def sniff_content_type(head: bytes) -> str:
+    """
+    Classify a response body from its first bytes.
+    
+    Catches PDFs and images served from URLs without a file extension
+    (e.g. /download/123), which URL checks would send to the HTML parsers.
+    
+    Args:
+        head: Start of the body (SNIFF_BYTES is enough)
+        
+    Returns:
+        'pdf', 'image' or 'html'
+    """
+    # Some PDF writers put junk before the header, which readers tolerate
+    if b'%PDF-' in head[:SNIFF_BYTES]:
+        return 'pdf'
+    if head.startswith((b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff', b'GIF87a', b'GIF89a', b'BM')):
+        return 'image'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image'
+    return 'html'
+
 
 class BaseParser(ABC):
     """Base class for all menu parsers"""
@@ -36,3 +85,18 @@ class BaseParser(ABC):
             True if parser can handle this content
         """
         pass
+    
+    async def try_parse(self, url: str, html_content: Optional[str] = None) -> Optional[List[MenuItem]]:
+        """
+        Check and parse in one call, so parsers can share work between the two.
+        
+        Args:
+            url: Restaurant website URL
+            html_content: Optional HTML content
+            
+        Returns:
+            List of menu items, or None if this parser cannot handle the content
+        """
+        if not self.can_parse(url, html_content):
+            return None
+        return await self.parse(url, html_content)
@@ -11,13 +11,19 @@ Uses ONLY standardized schema.org properties:
 
 Reference: https://schema.org/MenuItem
 """
+import asyncio
 import extruct
-import json
-from typing import List, Optional, Dict, Any
-from ...models import MenuItem, Menu
+import itertools
+import orjson
+import re
+from collections import deque
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
+from pydantic import ValidationError
+from ...models import MenuItem
 from .base import BaseParser
-import instructor
-from openai import OpenAI
+from .llm import LLMBatcher, get_instructor_client
+from ..cache import LLMResponseCache
 import os
 from dotenv import load_dotenv
 
@@ -46,13 +52,70 @@ PROP_PRICE_CURRENCY = 'priceCurrency'  # From Offer
 # JSON-LD specific
 JSONLD_TYPE = '@type'
 
+# Markers that must appear in a page for JSON-LD, microdata or RDFa to exist
+_STRUCTURED_MARKER_RE = re.compile(r'application/ld\+json|itemscope|typeof=', re.IGNORECASE)
+_MICRODATA_RDFA_MARKER_RE = re.compile(r'itemscope|typeof=', re.IGNORECASE)
+_JSONLD_SCRIPT_RE = re.compile(
+    r'<script[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+_PRICE_RE = re.compile(r'[\d.]+')
+
+# Semi-structured item: (raw extruct data, section name)
+SemiStructuredItem = Tuple[Dict[str, Any], Optional[str]]
+# Extractor output: (parsed item, None) or (None, semi-structured item)
+ExtractedItem = Tuple[Optional[Dict[str, Any]], Optional[SemiStructuredItem]]
+
+# Food keywords matched locally in item names/descriptions and passed to the LLM
+# as tag hints (plural forms match the same tag)
+TAG_VOCABULARY = [
+    'salad', 'rice', 'noodle', 'curry', 'soup', 'vegetarian', 'vegan', 'spicy', 'seafood',
+    'chicken', 'beef', 'pork', 'lamb', 'duck', 'fish', 'shrimp', 'tofu', 'pasta', 'pizza',
+    'burger', 'sandwich', 'taco', 'sushi', 'dumpling', 'gluten-free', 'cocktail', 'wine',
+    'beer', 'coffee', 'tea',
+]
+_TAG_RE = re.compile(r'\b(' + '|'.join(map(re.escape, TAG_VOCABULARY)) + r')(?:e?s)?\b', re.IGNORECASE)
+
+# Prompt budget for serialized extruct items
+LLM_INPUT_CHAR_LIMIT = 8000
+
+# Instructions shared by every refinement request (request data is appended)
+REFINE_INSTRUCTIONS = """You are processing menu items extracted from schema.org structured markup (JSON-LD, microdata, RDFa).
+
+The extruct library has already extracted reliable data from the structured markup. Your job is to fill in ONLY the missing fields: type and tags.
+
+CRITICAL RULES:
+1. **TRUST extruct data** - Use name, price, description, section, dietary_info exactly as provided
+2. **DO NOT change** name, price, description, section, dietary_info values
+3. **ONLY infer** the following fields:
+   - type: Must be one of ["appetizer", "entree", "drink"] - infer from section name, item name, or description
+   - tags: Generate relevant food tags (e.g., ["salads", "rice", "noodle", "curry", "soup", "vegetarian", "spicy", "seafood"]) based on description and name
+
+Standardized schema.org properties already extracted (USE THESE VALUES AS-IS):
+- name (Thing.name) - DO NOT CHANGE
+- description (Thing.description) - DO NOT CHANGE  
+- price (from MenuItem.offers.price) - DO NOT CHANGE
+- section (from MenuSection.name) - DO NOT CHANGE
+- dietary_info (from MenuItem.suitableForDiet) - DO NOT CHANGE
+
+tags_hint lists food keywords already found in the item's name/description. Include them in tags and add any other relevant tags.
+"""
+
 
 class ExtructParser(BaseParser):
     """Extract menu items from structured data in HTML, using LLM to fill in type and tags for all items"""
     
     def __init__(self):
         self.supported_formats = ['json-ld', 'microdata', 'rdfa']
-        self.client = instructor.from_openai(OpenAI(api_key=os.getenv('OPENAI_API_KEY'))) if os.getenv('OPENAI_API_KEY') else None
+        self.client = get_instructor_client() if os.getenv('OPENAI_API_KEY') else None
+        self.model = os.getenv('MENU_LLM_MODEL', 'gpt-4o-mini')
+        self.batcher = LLMBatcher(self.client, REFINE_INSTRUCTIONS, model=self.model) if self.client else None
+        self.response_cache = LLMResponseCache()
+    
+    async def aclose(self):
+        """Stop the LLM batcher's background consumer"""
+        if self.batcher:
+            await self.batcher.aclose()
     
     async def parse(self, url: str, html_content: Optional[str] = None) -> List[MenuItem]:
         """
@@ -70,59 +133,113 @@ class ExtructParser(BaseParser):
         
         try:
             # Extract structured data
-            data = extruct.extract(html_content, uniform=True)
+            data = self._run_extruct(html_content)
+            return await self._parse_structured_data(data)
             
-            menu_items = []
-            semi_structured_data = []
-            
-            # Process JSON-LD data
-            if 'json-ld' in data:
-                items, semi = self._extract_from_jsonld(data['json-ld'])
-                menu_items.extend(items)
-                semi_structured_data.extend(semi)
-            
-            # Process microdata
-            if 'microdata' in data:
-                items, semi = self._extract_from_microdata(data['microdata'])
-                menu_items.extend(items)
-                semi_structured_data.extend(semi)
-            
-            # Process RDFa
-            if 'rdfa' in data:
-                items, semi = self._extract_from_rdfa(data['rdfa'])
-                menu_items.extend(items)
-                semi_structured_data.extend(semi)
-            
-            # Use LLM to refine ALL items (complete and semi-structured) for type and tags
-            # Extruct data (name, price, description) takes precedence, LLM fills type/tags
-            if menu_items and self.client:
-                refined_items = self._refine_items_with_llm(menu_items, semi_structured_data)
-                return refined_items
-            
-            # No items found or LLM client unavailable
+        except Exception as e:
+            print(f"Error in extruct parsing for {url}: {e}")
             return []
+    
+    async def try_parse(self, url: str, html_content: Optional[str] = None) -> Optional[List[MenuItem]]:
+        """
+        Detect and extract structured data with a single extruct run.
+        
+        Returns:
+            List of MenuItem objects, or None if the page has no structured data
+        """
+        if not html_content or not _STRUCTURED_MARKER_RE.search(html_content):
+            return None
+        
+        try:
+            data = await self._run_extruct_async(html_content)
+            if not (data.get('json-ld') or data.get('microdata') or data.get('rdfa')):
+                return None
+            return await self._parse_structured_data(data)
             
         except Exception as e:
             print(f"Error in extruct parsing for {url}: {e}")
             return []
     
+    async def _parse_structured_data(self, data: Dict[str, Any]) -> List[MenuItem]:
+        """Build menu items from extruct output"""
+        if not self.client:
+            # LLM client unavailable
+            return []
+        
+        # Items are streamed from each format straight into the LLM payload
+        extracted = itertools.chain(
+            self._extract_from_jsonld(data.get('json-ld') or []),
+            self._extract_from_microdata(data.get('microdata') or []),
+            self._extract_from_rdfa(data.get('rdfa') or []),
+        )
+        
+        # Use LLM to refine ALL items (complete and semi-structured) for type and tags
+        # Extruct data (name, price, description) takes precedence, LLM fills type/tags
+        return await self._refine_items_with_llm(extracted)
+    
     def can_parse(self, url: str, html_content: Optional[str] = None) -> bool:
         """Check if structured data exists in HTML"""
         if not html_content:
             return False
         
+        # Cheap scan first; most pages have no structured data at all
+        if not _STRUCTURED_MARKER_RE.search(html_content):
+            return False
+        
         try:
-            data = extruct.extract(html_content, uniform=True)
+            data = self._run_extruct(html_content)
             # Check if any structured data exists
             return bool(data.get('json-ld') or data.get('microdata') or data.get('rdfa'))
         except Exception:
             return False
     
-    def _extract_from_jsonld(self, jsonld_data: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Extract menu items from JSON-LD data, return (parsed_items, semi_structured_data)"""
-        items = []
-        semi_structured = []
+    def _run_extruct(self, html_content: str) -> Dict[str, Any]:
+        """
+        Extract JSON-LD, microdata and RDFa from a page.
+        
+        JSON-LD (by far the most common on restaurant sites) is read straight out
+        of its <script> tags. extruct's DOM-based extractors only run for
+        microdata/RDFa when the page has their markers, or for everything when a
+        JSON-LD block needs extruct's more lenient parsing.
+        """
+        jsonld = self._fast_jsonld(html_content)
+        if jsonld is None:
+            return extruct.extract(html_content, syntaxes=self.supported_formats, uniform=True)
         
+        data = {'json-ld': jsonld}
+        if _MICRODATA_RDFA_MARKER_RE.search(html_content):
+            data.update(extruct.extract(html_content, syntaxes=['microdata', 'rdfa'], uniform=True))
+        return data
+    
+    async def _run_extruct_async(self, html_content: str) -> Dict[str, Any]:
+        """Same as _run_extruct, but off the event loop in a worker thread"""
+        return await asyncio.to_thread(self._run_extruct, html_content)
+    
+    def _fast_jsonld(self, html_content: str) -> Optional[List[Dict[str, Any]]]:
+        """Parse JSON-LD script bodies directly; None if any block isn't strict JSON"""
+        items = []
+        for body in _JSONLD_SCRIPT_RE.findall(html_content):
+            body = body.strip()
+            if not body:
+                continue
+            try:
+                data = orjson.loads(body)
+            except orjson.JSONDecodeError:
+                return None
+            
+            for obj in self._as_list(data):
+                if type(obj) is not dict:
+                    continue
+                # Flatten @graph containers so their nodes are checked like top-level items
+                graph = obj.get('@graph')
+                if type(graph) is list:
+                    items.extend(node for node in graph if type(node) is dict)
+                else:
+                    items.append(obj)
+        return items
+    
+    def _extract_from_jsonld(self, jsonld_data: List[Dict[str, Any]]) -> Iterator[ExtractedItem]:
+        """Yield (parsed_item, semi_structured_item) pairs from JSON-LD data"""
         for item in jsonld_data:
             item_type = item.get(JSONLD_TYPE)
             
@@ -130,132 +247,89 @@ class ExtructParser(BaseParser):
             if item_type == SCHEMA_MENU_ITEM:
                 menu_item = self._parse_menu_item(item)
                 if menu_item:
-                    items.append(menu_item)
+                    yield menu_item, None
                 elif self._is_semi_structured(item):
-                    # Preserve raw data for LLM processing
-                    item['raw_data'] = item.copy()
-                    semi_structured.append(item)
+                    # Keep raw data (read-only) for LLM processing
+                    yield None, (item, None)
             
             # Check for nested menu structures (Restaurant -> Menu -> MenuSection -> MenuItem)
             if PROP_HAS_MENU in item:
                 menu = item[PROP_HAS_MENU]
                 if isinstance(menu, dict):
-                    items_from_menu, semi_from_menu = self._extract_from_menu(menu)
-                    items.extend(items_from_menu)
-                    semi_structured.extend(semi_from_menu)
-        
-        return items, semi_structured
+                    yield from self._extract_from_menu(menu)
     
-    def _extract_from_menu(self, menu: Dict[str, Any]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Extract items from Menu object (handles MenuSection nesting)"""
-        items = []
-        semi_structured = []
+    def _extract_from_menu(self, menu: Dict[str, Any]) -> Iterator[ExtractedItem]:
+        """Yield items from a Menu object (handles MenuSection nesting)"""
+        for menu_item_data, section_name in self._walk_menu(menu):
+            parsed_item = self._parse_menu_item(menu_item_data, section_name=section_name)
+            if parsed_item:
+                yield parsed_item, None
+            elif self._is_semi_structured(menu_item_data):
+                # Raw data and section name for LLM processing
+                yield None, (menu_item_data, section_name)
+    
+    def _walk_menu(self, menu: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], Optional[str]]]:
+        """
+        Yield (menu_item_data, section_name) for every item under a Menu's sections.
         
-        # Get menu sections
-        sections = menu.get(PROP_HAS_MENU_SECTION, [])
-        if not isinstance(sections, list):
-            sections = [sections] if sections else []
+        Iterative depth-first walk over hasMenuSection at any depth (e.g. Dinner ->
+        Starters -> MenuItem); nested sections without a name inherit the parent's.
+        Items are yielded in document order.
+        """
+        stack = deque((section, None) for section in reversed(self._as_list(menu.get(PROP_HAS_MENU_SECTION))))
         
-        for section in sections:
+        while stack:
+            section, parent_section = stack.pop()
             if not isinstance(section, dict):
                 continue
             
-            section_name = section.get(PROP_NAME)  # Standardized: MenuSection.name
-            
-            # Get menu items from this section
-            menu_items = section.get(PROP_HAS_MENU_ITEM, [])
-            if not isinstance(menu_items, list):
-                menu_items = [menu_items] if menu_items else []
+            section_name = section.get(PROP_NAME) or parent_section  # Standardized: MenuSection.name
             
-            for menu_item_data in menu_items:
-                parsed_item = self._parse_menu_item(menu_item_data, section_name=section_name)
-                if parsed_item:
-                    items.append(parsed_item)
-                elif self._is_semi_structured(menu_item_data):
-                    # Preserve section name and raw data for LLM processing
-                    menu_item_data['_section_name'] = section_name
-                    menu_item_data['raw_data'] = menu_item_data.copy()
-                    semi_structured.append(menu_item_data)
+            for menu_item_data in self._as_list(section.get(PROP_HAS_MENU_ITEM)):
+                if isinstance(menu_item_data, dict):
+                    yield menu_item_data, section_name
             
-            # Handle nested MenuSections (e.g., Dinner -> Starters -> MenuItem)
-            nested_sections = section.get(PROP_HAS_MENU_SECTION, [])
-            if nested_sections:
-                if not isinstance(nested_sections, list):
-                    nested_sections = [nested_sections]
-                for nested_section in nested_sections:
-                    nested_items, nested_semi = self._extract_from_menu_section(nested_section, parent_section=section_name)
-                    items.extend(nested_items)
-                    semi_structured.extend(nested_semi)
-        
-        return items, semi_structured
+            nested_sections = self._as_list(section.get(PROP_HAS_MENU_SECTION))
+            stack.extend((nested, section_name) for nested in reversed(nested_sections))
     
-    def _extract_from_menu_section(self, section: Dict[str, Any], parent_section: Optional[str] = None) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Extract items from a MenuSection"""
-        items = []
-        semi_structured = []
-        
-        section_name = section.get(PROP_NAME) or parent_section
-        
-        menu_items = section.get(PROP_HAS_MENU_ITEM, [])
-        if not isinstance(menu_items, list):
-            menu_items = [menu_items] if menu_items else []
-        
-        for menu_item_data in menu_items:
-            parsed_item = self._parse_menu_item(menu_item_data, section_name=section_name)
-            if parsed_item:
-                items.append(parsed_item)
-            elif self._is_semi_structured(menu_item_data):
-                menu_item_data['_section_name'] = section_name
-                menu_item_data['raw_data'] = menu_item_data.copy()
-                semi_structured.append(menu_item_data)
-        
-        return items, semi_structured
+    @staticmethod
+    def _as_list(value: Any) -> List[Any]:
+        """Normalize a schema.org property that may hold one value or a list"""
+        if type(value) is list:
+            return value
+        return [value] if value else []
     
-    def _extract_from_microdata(self, microdata: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Extract menu items from microdata, return (parsed_items, semi_structured_data)"""
-        items = []
-        semi_structured = []
-        
+    def _extract_from_microdata(self, microdata: List[Dict[str, Any]]) -> Iterator[ExtractedItem]:
+        """Yield (parsed_item, semi_structured_item) pairs from microdata"""
         for item in microdata:
             item_type = item.get('type')  # microdata uses 'type' not '@type'
             
             if item_type == SCHEMA_MENU_ITEM or item_type == SCHEMA_PRODUCT:
                 menu_item = self._parse_menu_item(item)
                 if menu_item:
-                    items.append(menu_item)
+                    yield menu_item, None
                 elif self._is_semi_structured(item):
-                    # Preserve raw data for LLM processing
-                    item['raw_data'] = item.copy()
-                    semi_structured.append(item)
+                    # Keep raw data (read-only) for LLM processing
+                    yield None, (item, None)
             
             # Check for menu structures
             if PROP_HAS_MENU in item:
                 menu = item[PROP_HAS_MENU]
                 if isinstance(menu, dict):
-                    menu_items, menu_semi = self._extract_from_menu(menu)
-                    items.extend(menu_items)
-                    semi_structured.extend(menu_semi)
-        
-        return items, semi_structured
+                    yield from self._extract_from_menu(menu)
     
-    def _extract_from_rdfa(self, rdfa_data: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Extract menu items from RDFa data, return (parsed_items, semi_structured_data)"""
-        items = []
-        semi_structured = []
-        
+    def _extract_from_rdfa(self, rdfa_data: List[Dict[str, Any]]) -> Iterator[ExtractedItem]:
+        """Yield (parsed_item, semi_structured_item) pairs from RDFa data"""
         for item in rdfa_data:
             # RDFa uses full URIs: http://schema.org/MenuItem
             item_type = str(item.get('type', ''))
             if 'schema.org/MenuItem' in item_type:
                 menu_item = self._parse_menu_item(item)
                 if menu_item:
-                    items.append(menu_item)
+                    yield menu_item, None
                 elif self._is_semi_structured(item):
-                    # Preserve raw data for LLM processing
-                    item['raw_data'] = item.copy()
-                    semi_structured.append(item)
-        
-        return items, semi_structured
+                    # Keep raw data (read-only) for LLM processing
+                    yield None, (item, None)
     
     def _parse_menu_item(self, data: Dict[str, Any], section_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
@@ -288,7 +362,7 @@ class ExtructParser(BaseParser):
                 description = description.strip() if isinstance(description, str) else None
             
             # Extract section name (from parent MenuSection.name, passed as parameter)
-            section = section_name or data.get('_section_name')
+            section = section_name
             
             # Extract dietary info - standardized: MenuItem.suitableForDiet
             dietary_info = self._extract_dietary_info(data)
@@ -301,6 +375,7 @@ class ExtructParser(BaseParser):
                 'description': description,
                 'section': section,
                 'dietary_info': dietary_info,
+                'tags_hint': _tag_hints(name, description),
                 'raw_data': data,  # Keep original extruct data for LLM context
             }
             
@@ -322,7 +397,7 @@ class ExtructParser(BaseParser):
         # Consider semi-structured if has name but missing price
         return has_name and missing_price
     
-    def _refine_items_with_llm(self, parsed_items: List[Dict[str, Any]], semi_structured_data: List[Dict[str, Any]]) -> List[MenuItem]:
+    async def _refine_items_with_llm(self, extracted: Iterable[ExtractedItem]) -> List[MenuItem]:
         """
         Use LLM to refine ALL extruct items - fill in type and tags.
         Extruct data (name, price, description) takes precedence and is trusted.
@@ -333,99 +408,123 @@ class ExtructParser(BaseParser):
         2. Pass raw extruct data to LLM
         3. LLM fills in type and tags based on extruct data
         4. Merge: extruct values for name/price/description, LLM values for type/tags
+        
+        extracted yields (parsed_item, semi_structured_item) pairs. Items are
+        serialized as they arrive and dropped once the prompt budget is spent,
+        so only items that are actually sent are kept in memory.
         """
         if not self.client:
             return []
         
         try:
-            # Combine all items (complete and semi-structured)
-            all_items = parsed_items + semi_structured_data
-            
-            # Filter out None values
-            all_items = [item for item in all_items if item is not None]
-            
-            if not all_items:
-                return []
-            
-            # Prepare data for LLM - preserve extruct values
-            items_for_llm = []
-            for item in all_items:
-                if isinstance(item, dict):
-                    raw_data = item.get('raw_data', item)
-                    
-                    # Extract reliable extruct data
-                    # For semi-structured items, try to extract price from raw_data
-                    price = item.get('price')
-                    if price is None and raw_data:
-                        price = self._extract_price(raw_data)
-                    
-                    llm_item = {
-                        'name': item.get('name') or raw_data.get(PROP_NAME, '') if isinstance(raw_data, dict) else '',
-                        'price': price,
-                        'description': item.get('description') or (raw_data.get(PROP_DESCRIPTION) if isinstance(raw_data, dict) else None),
-                        'section': item.get('section') or item.get('_section_name'),
+            # Semi-structured items go after all complete items; only their
+            # (raw data, section) references are held until then
+            semi_structured_data = []
+            has_parsed = False
+            
+            def llm_items() -> Iterator[Dict[str, Any]]:
+                nonlocal has_parsed
+                # Prepare data for LLM - preserve extruct values
+                for item, semi in extracted:
+                    if semi is not None:
+                        semi_structured_data.append(semi)
+                        continue
+                    has_parsed = True
+                    yield {
+                        'name': item['name'],
+                        'price': item['price'],
+                        'description': item.get('description'),
+                        'section': item.get('section'),
                         'dietary_info': item.get('dietary_info'),
+                        'tags_hint': item.get('tags_hint'),
                         # Include raw extruct data for context
+                        'raw_extruct_data': item.get('raw_data'),
+                    }
+                
+                for raw_data, section_name in semi_structured_data:
+                    # For semi-structured items, try to extract price from raw_data
+                    llm_item = {
+                        'name': raw_data.get(PROP_NAME, ''),
+                        'price': self._extract_price(raw_data),
+                        'description': raw_data.get(PROP_DESCRIPTION),
+                        'section': section_name,
+                        'dietary_info': None,
+                        'tags_hint': _tag_hints(raw_data.get(PROP_NAME), raw_data.get(PROP_DESCRIPTION)),
                         'raw_extruct_data': raw_data,
                     }
                     # Only include items with name and price (required fields)
                     if llm_item.get('name') and llm_item.get('price'):
-                        items_for_llm.append(llm_item)
-            
-            if not items_for_llm:
+                        yield llm_item
+            
+            # Identical items (e.g. the same drink listed in several sections) are
+            # sent once; their type/tags are fanned back out to every occurrence.
+            # Convert to compact JSON for LLM as items arrive, until the budget is
+            # spent (items beyond it would be cut off anyway)
+            unique_index = {}
+            sent_items = []  # (item, index into the LLM response)
+            buf = bytearray(b'[')
+            budget_spent = False
+            for llm_item in llm_items():
+                key = (str(llm_item['name']), llm_item['price'], str(llm_item['description']))
+                position = unique_index.get(key)
+                if position is None:
+                    if budget_spent:
+                        continue
+                    encoded = orjson.dumps(llm_item, default=str)
+                    if unique_index and len(buf) + len(encoded) > LLM_INPUT_CHAR_LIMIT:
+                        budget_spent = True
+                        continue
+                    if unique_index:
+                        buf += b','
+                    buf += encoded
+                    position = unique_index[key] = len(unique_index)
+                sent_items.append((llm_item, position))
+            buf += b']'
+            
+            # Only pages with at least one complete item are refined
+            if not has_parsed or not sent_items:
                 return []
+            data_json = buf.decode()
             
-            # Convert to JSON for LLM
-            data_json = json.dumps(items_for_llm, indent=2, default=str)
-            
-            prompt = f"""You are processing menu items extracted from schema.org structured markup (JSON-LD, microdata, RDFa).
-
-The extruct library has already extracted reliable data from the structured markup. Your job is to fill in ONLY the missing fields: type and tags.
-
-CRITICAL RULES:
-1. **TRUST extruct data** - Use name, price, description, section, dietary_info exactly as provided
-2. **DO NOT change** name, price, description, section, dietary_info values
-3. **ONLY infer** the following fields:
-   - type: Must be one of ["appetizer", "entree", "drink"] - infer from section name, item name, or description
-   - tags: Generate relevant food tags (e.g., ["salads", "rice", "noodle", "curry", "soup", "vegetarian", "spicy", "seafood"]) based on description and name
-
-Standardized schema.org properties already extracted (USE THESE VALUES AS-IS):
-- name (Thing.name) - DO NOT CHANGE
-- description (Thing.description) - DO NOT CHANGE  
-- price (from MenuItem.offers.price) - DO NOT CHANGE
-- section (from MenuSection.name) - DO NOT CHANGE
-- dietary_info (from MenuItem.suitableForDiet) - DO NOT CHANGE
-
-Extracted menu items from extruct:
-{data_json[:8000]}  # Limit to avoid token limits
+            payload = f"""Extracted menu items from extruct:
+{data_json[:LLM_INPUT_CHAR_LIMIT]}  # Limit to avoid token limits
 """
             
-            menu = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                response_model=Menu,
-                temperature=0
-            )
+            # Re-crawled menus produce the same prompt; reuse the earlier response
+            cache_key = self.response_cache.key(self.model, REFINE_INSTRUCTIONS + payload)
+            menu = await self.response_cache.get(cache_key)
+            if menu is None:
+                # Concurrent refinements are coalesced into shared completions
+                menu = await self.batcher.submit(payload, size=len(unique_index))
+                # A batched reply can leave a request out or cut it short; only
+                # complete responses are cached, so partial ones get retried
+                if len(menu.items) >= len(unique_index):
+                    await self.response_cache.set(cache_key, menu)
             
             # Merge LLM output with extruct data (extruct takes precedence for name/price/description)
             final_items = []
-            for i, llm_item in enumerate(menu.items):
-                if i >= len(items_for_llm):
+            for extruct_item, position in sent_items:
+                if position >= len(menu.items):
                     continue
                 
-                extruct_item = items_for_llm[i]
+                llm_item = menu.items[position]
                 
                 # Extruct data takes precedence (more reliable from structured markup)
                 # LLM only provides type and tags
-                final_item = MenuItem(
-                    name=extruct_item.get('name') or llm_item.name,  # Extruct first
-                    price=extruct_item.get('price') or llm_item.price,  # Extruct first
-                    type=llm_item.type,  # From LLM (not in schema.org)
-                    section=extruct_item.get('section') or llm_item.section,  # Extruct first
-                    description=extruct_item.get('description') or llm_item.description,  # Extruct first
-                    tags=llm_item.tags,  # From LLM (not in schema.org)
-                    dietary_info=extruct_item.get('dietary_info') or llm_item.dietary_info,  # Extruct first
-                )
+                # Markup is arbitrary (e.g. a non-string section name); a bad
+                # item is dropped here rather than failing the whole menu
+                try:
+                    final_item = MenuItem(
+                        name=extruct_item.get('name') or llm_item.name,  # Extruct first
+                        price=extruct_item.get('price') or llm_item.price,  # Extruct first
+                        type=llm_item.type,  # From LLM (not in schema.org)
+                        section=extruct_item.get('section') or llm_item.section,  # Extruct first
+                        description=extruct_item.get('description') or llm_item.description,  # Extruct first
+                        tags=llm_item.tags + [tag for tag in extruct_item.get('tags_hint') or [] if tag not in llm_item.tags],  # From LLM plus local hints
+                        dietary_info=extruct_item.get('dietary_info') or llm_item.dietary_info,  # Extruct first
+                    )
+                except ValidationError:
+                    continue
                 final_items.append(final_item)
             
             return final_items
@@ -442,20 +541,13 @@ Extracted menu items from extruct:
         Reference: https://schema.org/Offer
         """
         # Standardized: MenuItem.offers (Offer object with price and priceCurrency)
-        offers = data.get(PROP_OFFERS)
-        if offers:
-            if isinstance(offers, dict):
-                # Standardized: Offer.price
-                price_str = offers.get(PROP_PRICE)
-                if price_str:
-                    return self._parse_price(price_str)
-            elif isinstance(offers, list) and offers:
-                # Handle list of offers (take first)
-                first_offer = offers[0]
-                if isinstance(first_offer, dict):
-                    price_str = first_offer.get(PROP_PRICE)
-                    if price_str:
-                        return self._parse_price(price_str)
+        # A single Offer or a list of offers (take first)
+        offers = self._as_list(data.get(PROP_OFFERS))
+        if offers and type(offers[0]) is dict:
+            # Standardized: Offer.price
+            price_str = offers[0].get(PROP_PRICE)
+            if price_str:
+                return self._parse_price(price_str)
         
         return None
     
@@ -471,26 +563,45 @@ Extracted menu items from extruct:
             return None
         
         # Can be a string (URL or text) or list
-        if isinstance(diet, str):
-            # Extract diet name from URL (e.g., "https://schema.org/GlutenFreeDiet" -> "gluten-free")
-            if 'schema.org/' in diet:
-                diet_name = diet.split('/')[-1].replace('Diet', '').lower()
-                return [diet_name]
-            return [diet.lower()]
-        elif isinstance(diet, list):
+        if type(diet) is str:
+            return [_diet_name(diet)]
+        elif type(diet) is list:
             return [str(d).lower() for d in diet]
         
         return None
     
     def _parse_price(self, price_str: str) -> Optional[float]:
         """Parse price string to float"""
-        import re
-        # Remove currency symbols and extract number
-        price_match = re.search(r'[\d.]+', str(price_str).replace(',', ''))
-        if price_match:
-            try:
-                return float(price_match.group())
-            except ValueError:
-                pass
-        return None
+        if isinstance(price_str, (int, float)):
+            return float(price_str)
+        
+        return _price_from_text(str(price_str))
+
+
+def _tag_hints(name: Any, description: Any) -> List[str]:
+    """Find TAG_VOCABULARY keywords in an item's name and description (one regex pass)"""
+    text = f"{name if type(name) is str else ''} {description if type(description) is str else ''}"
+    return list(dict.fromkeys(match.lower() for match in _TAG_RE.findall(text)))
+
+
+@lru_cache(maxsize=4096)
+def _price_from_text(price_text: str) -> Optional[float]:
+    """Parse a price string to float (cached; price strings repeat heavily across items)"""
+    # Remove currency symbols and extract number
+    price_match = _PRICE_RE.search(price_text.replace(',', ''))
+    if price_match:
+        try:
+            return float(price_match.group())
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _diet_name(diet: str) -> str:
+    """Normalize a suitableForDiet string (cached; diets come from a small vocabulary)"""
+    # Extract diet name from URL (e.g., "https://schema.org/GlutenFreeDiet" -> "glutenfree")
+    if 'schema.org/' in diet:
+        return diet.split('/')[-1].replace('Diet', '').lower()
+    return diet.lower()
     
@@ -5,20 +5,23 @@ import re
 from typing import List, Optional
 from ...models import MenuItem, Menu
 from .base import BaseParser
-import instructor
-from openai import OpenAI
-from crawl4ai import AsyncWebCrawler
-import os
+from .llm import create_completion, get_instructor_client
+from ..cache import LLMResponseCache
+from ..crawler import crawl
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_MENU_KEYWORD_RE = re.compile(r'menu|appetizer|entree|dessert|drink|price|\$', re.IGNORECASE)
+_PRICE_RE = re.compile(r'\$?\d+\.?\d{0,2}')
+
 
 class HtmlLlmParser(BaseParser):
     """Parse HTML menus using Crawl4AI for markdown generation and LLM extraction"""
     
     def __init__(self):
-        self.client = instructor.from_openai(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+        self.client = get_instructor_client()
+        self.response_cache = LLMResponseCache()
     
     async def parse(self, url: str, html_content: Optional[str] = None) -> List[MenuItem]:
         """
@@ -42,7 +45,7 @@ class HtmlLlmParser(BaseParser):
                 return []
             
             # Extract structured data using instructor
-            menu_items = self._extract_with_llm(menu_markdown, url)
+            menu_items = await self._extract_with_llm(menu_markdown, url)
             
             return menu_items
             
@@ -55,41 +58,35 @@ class HtmlLlmParser(BaseParser):
         if not html_content:
             return False
         
-        # Check for menu indicators
-        html_lower = html_content.lower()
-        menu_keywords = ['menu', 'appetizer', 'entree', 'dessert', 'drink', 'price', '$']
-        
-        has_keywords = any(keyword in html_lower for keyword in menu_keywords)
-        has_prices = bool(re.search(r'\$?\d+\.?\d{0,2}', html_content))
-        
-        return has_keywords and has_prices
+        # Check for menu indicators (one case-insensitive pass, no lowered copy)
+        return bool(_MENU_KEYWORD_RE.search(html_content) and _PRICE_RE.search(html_content))
     
-    async def _generate_markdown_with_crawl4ai(self, url: str, html_content: str) -> Optional[str]:
+    async def _generate_markdown_with_crawl4ai(self, url: str, html_content: Optional[str],
+                                               force_fetch: bool = False) -> Optional[str]:
         """
         Use Crawl4AI to generate clean markdown from HTML content.
         Crawl4AI handles HTML cleaning, content selection, and markdown generation.
         
-        We use Crawl4AI with the original URL to leverage its full capabilities
-        (dynamic content handling, better content selection, etc.).
-        The pre-fetched HTML is available but Crawl4AI will fetch fresh content
-        which may include dynamic elements that weren't in the initial fetch.
+        The pre-fetched HTML is passed to Crawl4AI through its raw-HTML scheme, so
+        no second fetch or browser render happens. MenuDiscovery has already
+        fallen back to a browser render for JavaScript-heavy pages. Set
+        force_fetch to have Crawl4AI load the original URL instead (dynamic
+        content handling, fresh content).
         """
         try:
-            # Create a new crawler instance for this request
-            # Using async with ensures proper cleanup
-            async with AsyncWebCrawler() as crawler:
-                # Use Crawl4AI with the original URL
-                # This allows Crawl4AI to:
-                # 1. Handle dynamic content (JavaScript-rendered menus)
-                # 2. Apply intelligent content selection
-                # 3. Generate optimized markdown for LLM consumption
-                result = await crawler.arun(
-                    url=url,
+            # Reuse the process-wide browser instead of starting one per request
+            # Crawl4AI applies intelligent content selection and generates
+            # optimized markdown for LLM consumption
+            if html_content and not force_fetch:
+                result = await crawl(f"raw:{html_content}")
+            else:
+                result = await crawl(
+                    url,
                     bypass_cache=True,  # Always fetch fresh content
                 )
-                
-                if result and result.markdown:
-                    return result.markdown
+            
+            if result and result.markdown:
+                return result.markdown
             
             return None
             
@@ -97,7 +94,7 @@ class HtmlLlmParser(BaseParser):
             print(f"Error generating markdown with Crawl4AI: {e}")
             return None
     
-    def _extract_with_llm(self, menu_markdown: str, url: str) -> List[MenuItem]:
+    async def _extract_with_llm(self, menu_markdown: str, url: str) -> List[MenuItem]:
         """
         Extract menu items from Crawl4AI-generated markdown using instructor.
         The markdown is already cleaned and optimized for LLM consumption.
@@ -116,12 +113,19 @@ Menu content (markdown):
 {menu_markdown[:8000]}  # Limit to avoid token limits
 """
             
-            menu = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                response_model=Menu,
-                temperature=0
-            )
+            # Re-crawled menus produce the same prompt; reuse the earlier response
+            model = "gpt-4o"
+            cache_key = self.response_cache.key(model, prompt)
+            menu = await self.response_cache.get(cache_key)
+            if menu is None:
+                menu = await create_completion(
+                    self.client,
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    response_model=Menu,
+                    temperature=0
+                )
+                await self.response_cache.set(cache_key, menu)
             
             return menu.items
             
@@ -1,26 +1,33 @@
 """
 Parser for image-based menus using OpenAI Vision API.
 """
-import base64
+import asyncio
+import hashlib
 import io
+import logging
 from typing import List, Optional
-import httpx
 from PIL import Image
 from ...models import MenuItem, Menu
-from .base import BaseParser
-import instructor
-from openai import OpenAI
-import os
+from .base import BaseParser, IMAGE_URL_RE
+from .llm import create_structured_completion, image_data_uri
+from ..http_client import get_http_client
+from ..cache import LLMResponseCache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+VISION_MODEL = "gpt-4o"
+
 
 class ImageParser(BaseParser):
     """Parse image menus using OpenAI Vision API"""
     
     def __init__(self):
-        self.client = instructor.from_openai(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+        self.http = get_http_client()
+        # Extracted menus keyed by the SHA-256 of the downloaded file
+        self.response_cache = LLMResponseCache(cache_dir="cache/vision")
     
     async def parse(self, url: str, html_content: Optional[str] = None) -> List[MenuItem]:
         """
@@ -35,46 +42,45 @@ class ImageParser(BaseParser):
         """
         try:
             # Download image
-            image = await self._download_image(url)
-            if not image:
+            image_bytes = await self._download_image(url)
+            if not image_bytes:
                 return []
             
+            # Re-runs send the same image again; reuse the earlier extraction
+            cache_key = self.response_cache.key(VISION_MODEL, hashlib.sha256(image_bytes).hexdigest())
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached.items
+            
             # Extract menu items from image
-            items = await self._extract_from_image(image)
+            items = await self._extract_from_image(Image.open(io.BytesIO(image_bytes)))
+            if items:
+                await self.response_cache.set(cache_key, Menu(items=items))
             return items
             
         except Exception as e:
-            print(f"Error in image parsing for {url}: {e}")
+            logger.warning("Error in image parsing for %s: %s", url, e)
             return []
     
     def can_parse(self, url: str, html_content: Optional[str] = None) -> bool:
         """Check if URL is an image"""
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp']
-        url_lower = url.lower()
-        return any(url_lower.endswith(ext) for ext in image_extensions)
+        return bool(IMAGE_URL_RE.search(url))
     
-    async def _download_image(self, url: str) -> Optional[Image.Image]:
+    async def _download_image(self, url: str) -> Optional[bytes]:
         """Download image file"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-                image_bytes = response.content
-                return Image.open(io.BytesIO(image_bytes))
+            response = await self.http.get(url)
+            response.raise_for_status()
+            return response.content
         except Exception as e:
-            print(f"Error downloading image {url}: {e}")
+            logger.warning("Error downloading image %s: %s", url, e)
             return None
     
     async def _extract_from_image(self, image: Image.Image) -> List[MenuItem]:
         """Extract menu items from image using Vision API"""
         try:
-            # Convert image to base64
-            buffered = io.BytesIO()
-            # Convert to RGB if necessary (some images have transparency)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+            # Convert image to a base64 JPEG data URI (in a worker thread, off the event loop)
+            data_uri = await asyncio.to_thread(image_data_uri, image)
             
             prompt = """Extract all menu items from this menu image.
 
@@ -86,21 +92,21 @@ Rules:
 - Return structured JSON matching the schema
 """
             
-            menu = self.client.chat.completions.create(
-                model="gpt-4o",
+            menu = await create_structured_completion(
+                Menu,
+                model=VISION_MODEL,
                 messages=[{
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_base64}"}}
+                        {"type": "image_url", "image_url": {"url": data_uri}}
                     ]
                 }],
-                response_model=Menu,
                 temperature=0
             )
             
             return menu.items
             
         except Exception as e:
-            print(f"Error extracting from image: {e}")
+            logger.warning("Error extracting from image: %s", e)
             return []
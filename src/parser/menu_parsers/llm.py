@@ -0,0 +1,281 @@
+"""
+Shared OpenAI access for the LLM-backed menu parsers.
+"""
+import asyncio
+import base64
+import io
+import os
+import httpx
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type, TypeVar
+from pydantic import BaseModel, Field
+from dotenv import load_dotenv
+import instructor
+from openai import AsyncOpenAI
+from PIL import Image
+from ...models import Menu, MenuItem
+
+load_dotenv()
+
+# Maximum in-flight OpenAI requests, shared across all parser instances
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
+
+# Request coalescing for LLMBatcher: max requests and items per batched
+# completion, and how long to wait for more requests after the first
+LLM_BATCH_MAX_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', '32'))
+LLM_BATCH_MAX_ITEMS = int(os.getenv('LLM_BATCH_MAX_ITEMS', '150'))
+LLM_BATCH_WAIT_S = float(os.getenv('LLM_BATCH_WAIT_S', '0.002'))
+
+_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+# Longest side of images sent to the Vision API; the API downsamples larger
+# images anyway, so anything bigger only costs upload and encode time
+VISION_MAX_SIDE = int(os.getenv('VISION_MAX_SIDE', '2048'))
+
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client, so all parsers share one connection pool"""
+    # Long read timeout for slow completions, but fail fast when the API can't be reached
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+    return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=http_client)
+
+
+@lru_cache(maxsize=1)
+def get_instructor_client():
+    """Get the process-wide instructor client wrapping get_openai_client()"""
+    return instructor.from_openai(get_openai_client())
+
+
+async def create_completion(client, **kwargs):
+    """
+    Run an instructor chat completion on an async client, bounded by OPENAI_MAX_CONCURRENCY.
+    
+    Args:
+        client: instructor client wrapping AsyncOpenAI
+        **kwargs: Arguments for chat.completions.create
+        
+    Returns:
+        Parsed response_model instance
+    """
+    async with _semaphore:
+        return await client.chat.completions.create(**kwargs)
+
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def json_schema_format(response_model: Type[BaseModel]) -> Dict[str, Any]:
+    """Build (once per model) the native response_format for a Pydantic model"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": response_model.__name__,
+            "schema": response_model.model_json_schema(),
+            # Strict mode needs every field required and no defaults, which the
+            # menu models don't follow; the model still validates the result
+            "strict": False,
+        },
+    }
+
+
+async def create_structured_completion(response_model: Type[ModelT], **kwargs) -> ModelT:
+    """
+    Run a chat completion with OpenAI's native JSON schema output, bounded by OPENAI_MAX_CONCURRENCY.
+    
+    Skips instructor's parse/retry layer: the response is validated straight
+    from the JSON string, and a malformed response raises instead of retrying.
+    
+    Args:
+        response_model: Pydantic model describing the response
+        **kwargs: Arguments for chat.completions.create
+        
+    Returns:
+        Parsed response_model instance
+    """
+    async with _semaphore:
+        response = await get_openai_client().chat.completions.create(
+            response_format=json_schema_format(response_model),
+            **kwargs,
+        )
+    return response_model.model_validate_json(response.choices[0].message.content or '{}')
+
+
+def image_data_uri(image: Image.Image) -> str:
+    """
+    Encode an image as a JPEG data URI for the Vision API.
+    
+    JPEG is several times smaller than PNG for scanned and photographed menus,
+    and b64encode reads the encoder's buffer directly via getbuffer().
+    Oversized images are downscaled in place to VISION_MAX_SIDE first.
+    """
+    if max(image.size) > VISION_MAX_SIDE:
+        image.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.Resampling.LANCZOS)
+    # JPEG has no alpha channel (some images have transparency)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=85, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffered.getbuffer()).decode('ascii')}"
+
+
+class _BatchedMenu(BaseModel):
+    """Menu items for one request inside a batched completion"""
+    request_id: str
+    items: List[MenuItem] = Field(default_factory=list)
+
+
+class _BatchedMenus(BaseModel):
+    """Response model for a batched completion"""
+    menus: List[_BatchedMenu] = Field(default_factory=list)
+
+
+class LLMBatcher:
+    """
+    Coalesce concurrent completion requests that share the same instructions.
+    
+    Requests arriving within batch_wait_timeout_s of each other are combined
+    (up to max_batch_size requests and max_batch_items items) into one
+    completion that returns a Menu per request. A lone request is sent with
+    the plain single-request prompt.
+    """
+    
+    def __init__(self, client, instructions: str, model: str = "gpt-4o",
+                 max_batch_size: int = LLM_BATCH_MAX_SIZE,
+                 max_batch_items: int = LLM_BATCH_MAX_ITEMS,
+                 batch_wait_timeout_s: float = LLM_BATCH_WAIT_S):
+        self.client = client
+        self.instructions = instructions
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_items = max_batch_items
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._carry = None  # Request that did not fit in the previous batch
+        # In-flight batch completions; the event loop only holds weak references
+        # to tasks, so these keep them alive until they resolve their futures
+        self._tasks: set = set()
+    
+    async def submit(self, payload: str, size: int = 1) -> Menu:
+        """
+        Queue a request and wait for its result.
+        
+        Args:
+            payload: Request-specific prompt text (appended to the shared instructions)
+            size: Number of items the response is expected to contain
+            
+        Returns:
+            Menu for this request
+        """
+        if self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue()
+            self._carry = None
+            self._consumer = asyncio.create_task(self._consume())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, size, future))
+        return await future
+    
+    async def _consume(self):
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            first = self._carry or await self._queue.get()
+            self._carry = None
+            batch = [first]
+            total_items = first[1]
+            deadline = loop.time() + self.batch_wait_timeout_s
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if total_items + request[1] > self.max_batch_items:
+                    self._carry = request
+                    break
+                batch.append(request)
+                total_items += request[1]
+            
+            # Run the completion without holding up collection of the next batch
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def aclose(self):
+        """Stop collecting batches and wait for in-flight completions to finish"""
+        if self._consumer is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _run(self, batch):
+        """Send one completion for the batch and resolve each request's future"""
+        if len(batch) == 1:
+            payload, _, future = batch[0]
+            await self._run_single(payload, future)
+            return
+        
+        sections = "\n\n".join(
+            f"=== Request {request_id} ===\n{payload}"
+            for request_id, (payload, _, _) in enumerate(batch)
+        )
+        prompt = f"""{self.instructions}
+
+The input below contains {len(batch)} independent requests, each starting with a "=== Request <id> ===" header.
+Process each request on its own. Return one entry per request with its request_id, and list its items in the same order as that request's input.
+
+{sections}
+"""
+        try:
+            response = await create_completion(
+                self.client,
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                response_model=_BatchedMenus,
+                temperature=0
+            )
+            menus = {entry.request_id.strip(): entry.items for entry in response.menus}
+        except Exception:
+            # One malformed entry fails the whole batched response; retry
+            # every request on its own instead of failing them all
+            menus = {}
+        
+        # Requests the model left out (or all of them, after a failed batch)
+        # are sent individually rather than resolved with an empty menu
+        retries = []
+        for request_id, (payload, _, future) in enumerate(batch):
+            items = menus.get(str(request_id))
+            if items is None:
+                retries.append(self._run_single(payload, future))
+            elif not future.done():
+                future.set_result(Menu(items=items))
+        if retries:
+            await asyncio.gather(*retries)
+    
+    async def _run_single(self, payload: str, future: asyncio.Future):
+        """Send one request with the plain single-request prompt and resolve its future"""
+        try:
+            menu = await create_completion(
+                self.client,
+                model=self.model,
+                messages=[{"role": "user", "content": f"{self.instructions}\n{payload}"}],
+                response_model=Menu,
+                temperature=0
+            )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(menu)
@@ -1,27 +1,56 @@
 """
 Parser for PDF menus using OpenAI Vision API.
 """
-import base64
-import io
-from typing import List, Optional
-from pdf2image import convert_from_bytes
+import asyncio
+import ctypes
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Tuple
+import pypdfium2 as pdfium
 from PIL import Image
 from ...models import MenuItem, Menu
-from .base import BaseParser
-import instructor
-from openai import OpenAI
-import httpx
+from .base import BaseParser, PDF_URL_RE
+from .llm import VISION_MAX_SIDE, create_structured_completion, image_data_uri
+from ..http_client import get_http_client
+from ..cache import LLMResponseCache
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Maximum Vision API calls in flight for one PDF
+PDF_VISION_CONCURRENCY = int(os.getenv('PDF_VISION_CONCURRENCY', '10'))
+
+# Consecutive pages sent together in one Vision API call
+PDF_PAGES_PER_CALL = int(os.getenv('PDF_PAGES_PER_CALL', '4'))
+
+# Rasterized page batches waiting for a Vision worker; bounds memory to
+# PDF_BATCH_QUEUE_SIZE * PDF_PAGES_PER_CALL pages
+PDF_BATCH_QUEUE_SIZE = 2
+
+VISION_MODEL = "gpt-4o"
+
+# Maximum render resolution for PDF pages (pdf2image's default, which the prompts
+# were tuned on). Large pages render lower so their longest side is VISION_MAX_SIDE
+PDF_RENDER_DPI = 200
+
+# Largest PDF downloaded; bigger ones (or a Content-Length claiming more) are skipped
+MAX_PDF_BYTES = int(os.getenv('MAX_PDF_BYTES', str(50 * 1024 * 1024)))
+
+# pdfium is not thread-safe, so every call into it from worker threads is serialized
+_pdfium_lock = threading.Lock()
+
 
 class PdfParser(BaseParser):
     """Parse PDF menus using OpenAI Vision API"""
     
     def __init__(self):
-        self.client = instructor.from_openai(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+        self.http = get_http_client()
+        # Extracted menus keyed by the SHA-256 of the downloaded file
+        self.response_cache = LLMResponseCache(cache_dir="cache/vision")
     
     async def parse(self, url: str, html_content: Optional[str] = None) -> List[MenuItem]:
         """
@@ -40,45 +69,157 @@ class PdfParser(BaseParser):
             if not pdf_bytes:
                 return []
             
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_bytes)
-            
-            # Extract menu items from each page
-            all_items = []
-            for img in images:
-                items = await self._extract_from_image(img)
-                all_items.extend(items)
+            # Re-runs send the same PDF again; reuse the earlier extraction
+            cache_key = self.response_cache.key(VISION_MODEL, hashlib.sha256(pdf_bytes).hexdigest())
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached.items
             
+            all_items, complete = await self._extract_from_pdf(url, pdf_bytes)
+            # A PDF with a failed page batch is not cached, so it's retried next run
+            if all_items and complete:
+                await self.response_cache.set(cache_key, Menu(items=all_items))
             return all_items
             
         except Exception as e:
-            print(f"Error in PDF parsing for {url}: {e}")
+            logger.warning("Error in PDF parsing for %s: %s", url, e)
             return []
     
+    async def _extract_from_pdf(self, url: str, pdf_bytes: bytearray) -> Tuple[List[MenuItem], bool]:
+        """
+        Extract menu items from every page of a PDF, in page order.
+        
+        Returns:
+            (items, complete), where complete is False if any page failed to
+            render or extract
+        """
+        # Rasterize PDF_PAGES_PER_CALL pages at a time in a worker thread and
+        # hand each batch to one of PDF_VISION_CONCURRENCY Vision workers, so
+        # later pages render while earlier ones are being extracted
+        pdf = await asyncio.to_thread(self._open_pdf, pdf_bytes)
+        page_count = len(pdf)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=PDF_BATCH_QUEUE_SIZE)
+        results = {}
+        complete = True
+        
+        async def rasterize():
+            nonlocal complete
+            try:
+                for first_page in range(1, page_count + 1, PDF_PAGES_PER_CALL):
+                    last_page = min(first_page + PDF_PAGES_PER_CALL - 1, page_count)
+                    images = await asyncio.to_thread(self._render_pages, pdf, first_page, last_page)
+                    if images:
+                        await queue.put((first_page, images))
+            except Exception as e:
+                complete = False
+                logger.warning("Error rasterizing %s: %s", url, e)
+            finally:
+                for _ in range(PDF_VISION_CONCURRENCY):
+                    await queue.put(None)
+        
+        async def extract():
+            nonlocal complete
+            while (entry := await queue.get()) is not None:
+                first_page, images = entry
+                # A failed batch is skipped, not the whole PDF
+                try:
+                    results[first_page] = await self._extract_from_images(images)
+                except Exception as e:
+                    complete = False
+                    logger.warning("Error extracting pages %d-%d of %s: %s", first_page, first_page + len(images) - 1, url, e)
+        
+        try:
+            await asyncio.gather(rasterize(), *[extract() for _ in range(PDF_VISION_CONCURRENCY)])
+        finally:
+            with _pdfium_lock:
+                pdf.close()
+        
+        # Keep page order
+        all_items = []
+        for page in sorted(results):
+            all_items.extend(results[page])
+        
+        return all_items, complete
+    
+    def _open_pdf(self, pdf_bytes: bytearray) -> pdfium.PdfDocument:
+        """Open a PDF in memory, reading the download buffer in place"""
+        # A ctypes view over the bytearray lets pdfium read it without a copy
+        data = pdf_bytes if isinstance(pdf_bytes, bytes) else (ctypes.c_char * len(pdf_bytes)).from_buffer(pdf_bytes)
+        with _pdfium_lock:
+            return pdfium.PdfDocument(data)
+    
+    def _render_pages(self, pdf: pdfium.PdfDocument, first_page: int, last_page: int) -> List[Image.Image]:
+        """Render pages first_page..last_page (1-based, inclusive) in-process"""
+        images = []
+        with _pdfium_lock:
+            for index in range(first_page - 1, last_page):
+                page = pdf[index]
+                # Page size is in points (1/72 in); cap the DPI so poster-size pages
+                # aren't rendered huge only to be downscaled before upload
+                longest_side_pts = max(page.get_width(), page.get_height())
+                dpi = min(PDF_RENDER_DPI, VISION_MAX_SIDE / longest_side_pts * 72) if longest_side_pts else PDF_RENDER_DPI
+                images.append(page.render(scale=dpi / 72).to_pil())
+        return images
+    
     def can_parse(self, url: str, html_content: Optional[str] = None) -> bool:
         """Check if URL is a PDF"""
-        return url.lower().endswith('.pdf') or '.pdf' in url.lower()
+        return bool(PDF_URL_RE.search(url))
     
-    async def _download_pdf(self, url: str) -> Optional[bytes]:
-        """Download PDF file"""
+    async def _download_pdf(self, url: str) -> Optional[bytearray]:
+        """
+        Download PDF file, streaming the body into a single buffer.
+        
+        The buffer is preallocated from Content-Length when the server sends it,
+        so large menus aren't copied from httpx's buffer into a new bytes object.
+        Downloads over MAX_PDF_BYTES are abandoned.
+        """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, follow_redirects=True)
+            async with self.http.stream("GET", url) as response:
                 response.raise_for_status()
-                return response.content
+                # Content-Length is the encoded size; a compressed or mislabeled
+                # body just falls back to growing the buffer
+                try:
+                    content_length = int(response.headers.get('content-length', 0))
+                except ValueError:
+                    content_length = 0
+                if content_length > MAX_PDF_BYTES:
+                    logger.warning("Skipping PDF %s: Content-Length %d exceeds %d bytes", url, content_length, MAX_PDF_BYTES)
+                    return None
+                buf = bytearray(max(content_length, 0))
+                size = 0
+                async for chunk in response.aiter_bytes(65536):
+                    end = size + len(chunk)
+                    if end > MAX_PDF_BYTES:
+                        logger.warning("Skipping PDF %s: larger than %d bytes", url, MAX_PDF_BYTES)
+                        return None
+                    if end <= len(buf):
+                        buf[size:end] = chunk
+                    else:
+                        del buf[size:]
+                        buf += chunk
+                    size = end
+                del buf[size:]
+                return buf
         except Exception as e:
-            print(f"Error downloading PDF {url}: {e}")
+            logger.warning("Error downloading PDF %s: %s", url, e)
             return None
     
-    async def _extract_from_image(self, image: Image.Image) -> List[MenuItem]:
-        """Extract menu items from image using Vision API"""
-        try:
-            # Convert image to base64
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
-            
-            prompt = """Extract all menu items from this menu PDF page.
+    async def _extract_from_images(self, images: List[Image.Image]) -> List[MenuItem]:
+        """
+        Extract menu items from consecutive PDF pages with one Vision API call.
+        
+        Errors propagate, so the caller can tell a failed batch from an empty one.
+        """
+        if len(images) == 1:
+            pages = "this menu PDF page"
+        else:
+            pages = "these consecutive pages of the same menu PDF (return one menu with the items from all pages, in page order)"
+        
+        # Encode each page as a base64 JPEG data URI in worker threads; PIL
+        # releases the GIL while encoding, so pages encode in parallel
+        data_uris = await asyncio.gather(*[asyncio.to_thread(image_data_uri, image) for image in images])
+        
+        prompt = f"""Extract all menu items from {pages}.
 
 Rules:
 - Identify appetizers (starters, small plates), entrees (main dishes), and drinks (beverages)
@@ -87,22 +228,18 @@ Rules:
 - Extract section names if available (e.g., "Appetizers", "Entrees", "Desserts")
 - Return structured JSON matching the schema
 """
-            
-            menu = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_base64}"}}
-                    ]
-                }],
-                response_model=Menu,
-                temperature=0
-            )
-            
-            return menu.items
-            
-        except Exception as e:
-            print(f"Error extracting from image: {e}")
-            return []
+        
+        menu = await create_structured_completion(
+            Menu,
+            model=VISION_MODEL,
+            messages=[{
+                "role": "user",
+                "content": [{"type": "text", "text": prompt}] + [
+                    {"type": "image_url", "image_url": {"url": data_uri}}
+                    for data_uri in data_uris
+                ]
+            }],
+            temperature=0
+        )
+        
+        return menu.items
@@ -2,20 +2,27 @@
 Main script for parsing restaurant menus.
 """
 import asyncio
-import json
 import os
+import orjson
 from pathlib import Path
 from typing import List, Optional
 from dotenv import load_dotenv
 from tqdm.asyncio import tqdm
 
-from ..models import RestaurantMenu, MenuItem
+from ..models import Restaurant, RestaurantMenu, MenuItem
 from .parser_factory import ParserFactory
+from .menu_parsers.base import classify_url
 from .menu_discovery import MenuDiscovery
 from .cache import MenuCache
+from .crawler import close_crawler
+from .http_client import close_http_client
 
 load_dotenv()
 
+# PDF and image menus are parsed at most this many at a time: rendering and
+# encoding pages is CPU-bound, unlike the I/O-bound HTML path
+BINARY_MENU_MAX_CONCURRENT = int(os.getenv('BINARY_MENU_MAX_CONCURRENT', str(os.cpu_count() or 4)))
+
 
 class MenuParser:
     """Main orchestrator for menu parsing"""
@@ -29,19 +36,25 @@ class MenuParser:
         self.parser_factory = ParserFactory()
         self.menu_discovery = MenuDiscovery()
         self.cache = MenuCache()
+        # Content type -> parser for menus that aren't HTML
+        self._binary_parsers = {
+            'pdf': self.parser_factory.pdf_parser,
+            'image': self.parser_factory.image_parser,
+        }
+        self._binary_semaphore = asyncio.Semaphore(BINARY_MENU_MAX_CONCURRENT)
     
-    async def parse_restaurant(self, restaurant: dict) -> Optional[RestaurantMenu]:
+    async def parse_restaurant(self, restaurant: Restaurant) -> Optional[RestaurantMenu]:
         """Parse menu for a single restaurant"""
-        restaurant_id = restaurant.get('place_id') or restaurant.get('id')
-        restaurant_name = restaurant.get('displayName', {}).get('text') or restaurant.get('name', 'Unknown')
-        website_uri = restaurant.get('websiteUri')
+        restaurant_id = restaurant.id
+        restaurant_name = restaurant.name
+        website_uri = restaurant.website_uri
         
         if not website_uri:
             print(f"No website URI for {restaurant_name}")
             return None
         
         # Check cache
-        cached_menu = self.cache.load(restaurant_id)
+        cached_menu = await self.cache.load(restaurant_id)
         if cached_menu:
             return cached_menu
         
@@ -54,13 +67,13 @@ class MenuParser:
                 print(f"Could not find menu URL for {restaurant_name}")
                 return None
             
-            # Route to appropriate parser based on URL type
-            if menu_url.lower().endswith('.pdf'):
-                # PDF parsing
-                menu_items = await self.parser_factory.pdf_parser.parse(menu_url)
-            elif self._is_image_url(menu_url):
-                # Image parsing (menu embedded in image)
-                menu_items = await self.parser_factory.image_parser.parse(menu_url)
+            # Route to appropriate parser based on the sniffed body, else URL type
+            content_type = self.menu_discovery.content_type(menu_url) or classify_url(menu_url)
+            binary_parser = self._binary_parsers.get(content_type)
+            if binary_parser:
+                # PDF or image parsing (Vision API), with its own concurrency limit
+                async with self._binary_semaphore:
+                    menu_items = await binary_parser.parse(menu_url)
             elif html_content:
                 # Parse HTML menu with extruct first, fallback to html_llm
                 menu_items = await self._parse_with_fallback(menu_url, html_content)
@@ -68,22 +81,21 @@ class MenuParser:
                 print(f"Could not fetch menu content for {restaurant_name}")
                 return None
             
-            # All parsers return List[MenuItem] per contract
             # Filter out None values and ensure all items are MenuItem instances
             valid_items = [item for item in menu_items if isinstance(item, MenuItem)]
             
             # Create restaurant menu
-            restaurant_menu = RestaurantMenu(
-                restaurant_id=restaurant_id,
-                restaurant_name=restaurant_name,
-                website_uri=menu_url,  # Use discovered menu URL
-                platform_detected=None,  # No longer tracking platform separately
-                menu=valid_items,
-                confidence_score=self._calculate_confidence(valid_items)
-            )
+            restaurant_menu = RestaurantMenu.model_validate({
+                'restaurant_id': restaurant_id,
+                'restaurant_name': restaurant_name,
+                'website_uri': menu_url,  # Use discovered menu URL
+                'platform_detected': None,  # No longer tracking platform separately
+                'menu': valid_items,
+            })
+            restaurant_menu.confidence_score = self._calculate_confidence(restaurant_menu.menu)
             
             # Save to cache
-            self.cache.save(restaurant_menu)
+            await self.cache.save(restaurant_menu)
             
             return restaurant_menu
             
@@ -91,47 +103,29 @@ class MenuParser:
             print(f"Error parsing {restaurant_name}: {e}")
             return None
     
-    def _is_image_url(self, url: str) -> bool:
-        """Check if URL is an image"""
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp']
-        url_lower = url.lower()
-        return any(url_lower.endswith(ext) for ext in image_extensions)
-    
     async def _parse_with_fallback(self, url: str, html_content: str) -> List[MenuItem]:
         """Parse menu with extruct first, fallback to html_llm"""
-        # Try extruct parser first
-        extruct_parser = self.parser_factory.extruct_parser
-        if extruct_parser.can_parse(url, html_content):
-            items = await extruct_parser.parse(url, html_content)
-            if items:
-                return items
+        # Try extruct parser first (one extruct run covers detection and extraction)
+        items = await self.parser_factory.extruct_parser.try_parse(url, html_content)
+        if items:
+            return items
         
         # Fallback to HTML+LLM parser
-        html_llm_parser = self.parser_factory.html_llm_parser
-        if html_llm_parser.can_parse(url, html_content):
-            return await html_llm_parser.parse(url, html_content)
-        
-        return []
+        return await self.parser_factory.html_llm_parser.try_parse(url, html_content) or []
     
     def _calculate_confidence(self, items: List[MenuItem]) -> float:
         """Calculate confidence score based on data completeness"""
         if not items:
             return 0.0
         
-        total_score = 0.0
-        for item in items:
-            score = 0.5  # Base score for having item
-            
-            if item.description:
-                score += 0.2
-            if item.section:
-                score += 0.15
-            if item.tags:
-                score += 0.15
-            
-            total_score += min(score, 1.0)
+        # Base score of 0.5 for having the item, plus 0.2 for a description and
+        # 0.15 each for a section and tags (at most 1.0, so no clamping needed)
+        total_score = 0.5 * len(items)
+        total_score += 0.2 * sum(1 for item in items if item.description)
+        total_score += 0.15 * sum(1 for item in items if item.section)
+        total_score += 0.15 * sum(1 for item in items if item.tags)
         
-        return total_score / len(items) if items else 0.0
+        return total_score / len(items)
     
     async def parse_all(self, max_concurrent: int = 10, restaurant_ids: Optional[List[str]] = None):
         """
@@ -142,47 +136,89 @@ class MenuParser:
             restaurant_ids: Optional list of restaurant IDs to filter by. If None, processes all restaurants.
         """
         # Load restaurants
-        with open(self.input_file, 'r') as f:
-            restaurants = json.load(f)
+        with open(self.input_file, 'rb') as f:
+            restaurants = orjson.loads(f.read())
         
         if not isinstance(restaurants, list):
             # Assume it's a dict with restaurants
             restaurants = restaurants.get('restaurants', [])
         
+        # Keep only the fields parsing needs; the raw dicts (with reviews) are dropped
+        restaurants = [Restaurant.from_place(r) for r in restaurants]
+        
         # Filter by restaurant IDs if provided
         if restaurant_ids:
             restaurant_ids_set = set(restaurant_ids)
-            restaurants = [
-                r for r in restaurants
-                if (r.get('id') in restaurant_ids_set or 
-                    r.get('place_id') in restaurant_ids_set)
-            ]
+            restaurants = [r for r in restaurants if r.id in restaurant_ids_set]
             if not restaurants:
                 print(f"No restaurants found matching the provided IDs: {restaurant_ids}")
                 return
             print(f"Filtered to {len(restaurants)} restaurant(s) matching provided IDs")
         
-        # Process restaurants
-        results = []
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # Restaurants without a website have nothing to parse; skip them before
+        # they take a worker slot
+        with_website = [r for r in restaurants if r.website_uri]
+        if len(with_website) < len(restaurants):
+            print(f"Skipping {len(restaurants) - len(with_website)} restaurant(s) without a website "
+                  f"({len(with_website)} to parse)")
+        restaurants = with_website
         
-        async def process_restaurant(restaurant):
-            async with semaphore:
-                return await self.parse_restaurant(restaurant)
+        # Process restaurants: max_concurrent workers pull from a shared
+        # iterator, so only that many parse coroutines exist at a time.
+        # Each menu is written as one NDJSON line as soon as it's parsed
+        # instead of being held until the end
+        ndjson_file = self.output_file.with_suffix('.ndjson')
+        parsed_count = 0
+        remaining = iter(restaurants)
+        # disable=None turns the bar off when output is not a terminal (logs, CI)
+        progress = tqdm(desc="Parsing menus", total=len(restaurants), disable=None)
         
-        tasks = [process_restaurant(r) for r in restaurants]
+        async def worker(out):
+            nonlocal parsed_count
+            for restaurant in remaining:
+                result = await self.parse_restaurant(restaurant)
+                if result:
+                    # Every dumped field is natively serializable; extraction dates
+                    # are naive UTC, so write them with an explicit +00:00 offset
+                    out.write(orjson.dumps(result.model_dump(), option=orjson.OPT_NAIVE_UTC) + b'\n')
+                    parsed_count += 1
+                progress.update(1)
         
-        for coro in tqdm.as_completed(tasks, desc="Parsing menus"):
-            result = await coro
-            if result:
-                results.append(result)
+        try:
+            with open(ndjson_file, 'wb') as out:
+                await asyncio.gather(*[worker(out) for _ in range(max_concurrent)])
+        finally:
+            progress.close()
+            # Release the shared HTTP clients and browser, and stop the LLM batcher
+            await self.menu_discovery.aclose()
+            await self.parser_factory.extruct_parser.aclose()
+            await close_http_client()
+            await close_crawler()
         
-        # Save results
-        output_data = [menu.dict() for menu in results]
-        with open(self.output_file, 'w') as f:
-            json.dump(output_data, f, indent=2, default=str)
+        # Save results as the JSON array consumers expect
+        coalesce_ndjson(ndjson_file, self.output_file)
         
-        print(f"\nParsed {len(results)} menus. Saved to {self.output_file}")
+        print(f"\nParsed {parsed_count} menus. Saved to {self.output_file} (one per line in {ndjson_file})")
+
+
+def coalesce_ndjson(ndjson_file: Path, json_file: Path):
+    """
+    Convert an NDJSON file (one JSON value per line) into a JSON array file.
+    
+    Lines are copied through without decoding, one array element per line,
+    so memory use stays flat regardless of the file size.
+    """
+    with open(ndjson_file, 'rb') as src, open(json_file, 'wb') as dst:
+        dst.write(b'[')
+        first = True
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            dst.write(b'\n' if first else b',\n')
+            dst.write(line)
+            first = False
+        dst.write(b'\n]\n' if not first else b']\n')
 
 
 async def main():
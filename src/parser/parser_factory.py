@@ -3,8 +3,7 @@ Parser factory for selecting the appropriate parser based on content.
 """
 from typing import Optional
 from .menu_parsers import ExtructParser, HtmlLlmParser, PdfParser, ImageParser
-from .menu_parsers.base import BaseParser
-import re
+from .menu_parsers.base import BaseParser, classify_url, sniff_content_type
 
 
 class ParserFactory:
@@ -16,35 +15,27 @@ class ParserFactory:
         self.pdf_parser = PdfParser()
         self.image_parser = ImageParser()
     
-    def get_parser(self, url: str, html_content: Optional[str] = None) -> BaseParser:
+    def get_parser(self, url: str, html_content: Optional[str] = None,
+                   head_bytes: Optional[bytes] = None) -> BaseParser:
         """
         Get the appropriate parser for the given URL/content.
         
         Args:
             url: Website URL
             html_content: Optional HTML content
+            head_bytes: Optional start of the fetched body; when given, its
+                magic bytes decide the parser instead of the URL
             
         Returns:
             Appropriate parser instance
         """
-        # Check for PDF first
-        if self._is_pdf(url):
+        # Magic bytes of the fetched body win over the URL's extension
+        content_type = sniff_content_type(head_bytes) if head_bytes else classify_url(url)
+        if content_type == 'pdf':
             return self.pdf_parser
-        
-        # Check for images
-        if self._is_image(url):
+        if content_type == 'image':
             return self.image_parser
         
         # For HTML content, return extruct parser (it will fallback to html_llm internally)
         # The parse_menus.py will handle the fallback chain
         return self.extruct_parser
-    
-    def _is_pdf(self, url: str) -> bool:
-        """Check if URL points to a PDF"""
-        return url.lower().endswith('.pdf') or '.pdf' in url.lower()
-    
-    def _is_image(self, url: str) -> bool:
-        """Check if URL points to an image"""
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp']
-        url_lower = url.lower()
-        return any(url_lower.endswith(ext) for ext in image_extensions)
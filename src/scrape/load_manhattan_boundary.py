@@ -2,15 +2,23 @@
 Load Manhattan boundary polygon from official NYC Open Data.
 Downloads and caches the GeoJSON data, then extracts Manhattan's polygon.
 """
-import json
+import logging
+import orjson
+from functools import lru_cache
 import httpx
 from pathlib import Path
-from shapely.geometry import shape, Polygon
+import shapely
+import shapely.wkb
+from shapely.geometry import shape, Polygon, MultiPolygon
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 # Cache directory for boundary data
 BOUNDARY_CACHE_DIR = Path("cache/boundaries")
-BOUNDARY_CACHE_FILE = BOUNDARY_CACHE_DIR / "manhattan_boundary.json"
+BOUNDARY_CACHE_FILE = BOUNDARY_CACHE_DIR / "manhattan_boundary.wkb"
+# Older caches stored only the exterior ring as a JSON coordinate list
+LEGACY_BOUNDARY_CACHE_FILE = BOUNDARY_CACHE_DIR / "manhattan_boundary.json"
 
 # NYC Open Data API endpoint for borough boundaries
 NYC_BOROUGH_BOUNDARIES_URL = "https://data.cityofnewyork.us/api/geospatial/tqmj-j8zm?method=export&format=GeoJSON"
@@ -18,32 +26,37 @@ NYC_BOROUGH_BOUNDARIES_URL = "https://data.cityofnewyork.us/api/geospatial/tqmj-
 # Alternative: GitHub mirror (more reliable)
 GITHUB_BOROUGHS_URL = "https://raw.githubusercontent.com/dwillis/nyc-maps/master/boroughs.geojson"
 
+# Loose (min_lon, max_lon, min_lat, max_lat) box around all of Manhattan, used to
+# skip other boroughs before building their geometry
+MANHATTAN_BBOX = (-74.06, -73.89, 40.67, 40.89)
+
 
 def download_borough_boundaries() -> Optional[dict]:
     """Download borough boundaries GeoJSON from NYC Open Data."""
-    try:
-        # Try GitHub mirror first (more reliable)
-        with httpx.Client(timeout=30.0) as client:
+    # One client for both sources, so the fallback reuses the connection pool
+    with httpx.Client(timeout=30.0, follow_redirects=True) as client:
+        try:
+            # Try GitHub mirror first (more reliable)
             response = client.get(GITHUB_BOROUGHS_URL)
             response.raise_for_status()
-            return response.json()
-    except Exception as e:
-        print(f"Error downloading from GitHub: {e}")
-        try:
-            # Fallback to NYC Open Data
-            with httpx.Client(timeout=30.0) as client:
+            # Parse the multi-megabyte GeoJSON straight from the body bytes
+            return orjson.loads(response.content)
+        except Exception as e:
+            logger.warning("Error downloading from GitHub: %s", e)
+            try:
+                # Fallback to NYC Open Data
                 response = client.get(NYC_BOROUGH_BOUNDARIES_URL)
                 response.raise_for_status()
-                return response.json()
-        except Exception as e2:
-            print(f"Error downloading from NYC Open Data: {e2}")
-            return None
+                return orjson.loads(response.content)
+            except Exception as e2:
+                logger.warning("Error downloading from NYC Open Data: %s", e2)
+                return None
 
 
 def extract_manhattan_polygon(geojson_data: dict) -> Optional[Polygon]:
     """Extract Manhattan polygon from GeoJSON data."""
     if geojson_data.get('type') != 'FeatureCollection':
-        print("Unexpected GeoJSON format")
+        logger.warning("Unexpected GeoJSON format")
         return None
     
     # Find Manhattan feature
@@ -63,20 +76,32 @@ def extract_manhattan_polygon(geojson_data: dict) -> Optional[Polygon]:
                     shapely_geom = shape(geometry)
                     if isinstance(shapely_geom, Polygon):
                         return shapely_geom
-                    elif hasattr(shapely_geom, 'geoms'):  # MultiPolygon
-                        # For MultiPolygon, return the largest polygon (main island)
-                        largest = max(shapely_geom.geoms, key=lambda p: p.area)
+                    elif isinstance(shapely_geom, MultiPolygon):
+                        # For MultiPolygon, return the largest polygon (main island).
+                        # Bounding-box area is enough to tell the island from the small
+                        # islands around it, without integrating every ring
+                        parts = shapely_geom.geoms
+                        if len(parts) == 1:
+                            return parts[0]
+                        largest = max(parts, key=lambda p: (p.bounds[2] - p.bounds[0]) * (p.bounds[3] - p.bounds[1]))
                         return largest
                 except Exception as e:
-                    print(f"Error converting geometry: {e}")
+                    logger.warning("Error converting geometry: %s", e)
                     continue
     
     # If not found by name, try to find by coordinates (Manhattan is roughly centered)
-    print("Manhattan not found by name, searching by coordinates...")
+    logger.warning("Manhattan not found by name, searching by coordinates")
     for feature in geojson_data.get('features', []):
         geometry = feature.get('geometry')
         if geometry and geometry.get('type') == 'Polygon':
             try:
+                # Cheap prefilter on the first vertex of the outer ring, so only
+                # candidates near Manhattan are converted with shape()
+                lon, lat = geometry['coordinates'][0][0][:2]
+                min_lon, max_lon, min_lat, max_lat = MANHATTAN_BBOX
+                if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+                    continue
+                
                 shapely_geom = shape(geometry)
                 if isinstance(shapely_geom, Polygon):
                     # Check if centroid is in Manhattan area
@@ -91,7 +116,7 @@ def extract_manhattan_polygon(geojson_data: dict) -> Optional[Polygon]:
 
 def load_manhattan_boundary(force_download: bool = False) -> Optional[Polygon]:
     """
-    Load Manhattan boundary polygon.
+    Load Manhattan boundary polygon, built and prepared once per process.
     
     Args:
         force_download: If True, download fresh data even if cache exists
@@ -99,41 +124,73 @@ def load_manhattan_boundary(force_download: bool = False) -> Optional[Polygon]:
     Returns:
         Shapely Polygon object representing Manhattan's boundary, or None if failed
     """
-    # Check cache first
+    if force_download:
+        _load_cached_boundary.cache_clear()
+        return _prepared(_load_boundary(force_download=True))
+    
+    polygon = _load_cached_boundary()
+    if polygon is None:
+        # Don't remember failures; the next call tries again
+        _load_cached_boundary.cache_clear()
+    return polygon
+
+
+@lru_cache(maxsize=1)
+def _load_cached_boundary() -> Optional[Polygon]:
+    """Load the boundary from the cache files (or download it), memoized"""
+    return _prepared(_load_boundary())
+
+
+def _prepared(polygon: Optional[Polygon]) -> Optional[Polygon]:
+    """
+    Prepare the polygon in place so contains/touches/intersects use an index
+    over its edges instead of scanning every vertex on each query.
+    """
+    if polygon is not None:
+        shapely.prepare(polygon)
+    return polygon
+
+
+def _load_boundary(force_download: bool = False) -> Optional[Polygon]:
+    """Load the boundary from the cache files, downloading it if missing or forced"""
+    # Check cache first (WKB is parsed in a single C call and keeps interior rings)
     if not force_download and BOUNDARY_CACHE_FILE.exists():
         try:
-            with open(BOUNDARY_CACHE_FILE, 'r') as f:
-                cached_data = json.load(f)
-                # Reconstruct polygon from cached coordinates
-                coords = cached_data.get('coordinates', [])
-                if coords:
-                    return Polygon(coords)
+            return shapely.wkb.loads(BOUNDARY_CACHE_FILE.read_bytes())
+        except Exception as e:
+            logger.warning("Error loading cached boundary: %s", e)
+    
+    if not force_download and LEGACY_BOUNDARY_CACHE_FILE.exists():
+        try:
+            cached_data = orjson.loads(LEGACY_BOUNDARY_CACHE_FILE.read_bytes())
+            # Reconstruct polygon from cached coordinates
+            coords = cached_data.get('coordinates', [])
+            if coords:
+                polygon = Polygon(coords)
+                BOUNDARY_CACHE_FILE.write_bytes(shapely.wkb.dumps(polygon))
+                return polygon
         except Exception as e:
-            print(f"Error loading cached boundary: {e}")
+            logger.warning("Error loading cached boundary: %s", e)
     
     # Download fresh data
     print("Downloading Manhattan boundary from NYC Open Data...")
     geojson_data = download_borough_boundaries()
     
     if not geojson_data:
-        print("Failed to download boundary data")
+        logger.error("Failed to download boundary data")
         return None
     
     # Extract Manhattan polygon
     polygon = extract_manhattan_polygon(geojson_data)
     
     if polygon:
-        # Cache the polygon coordinates
+        # Cache the polygon as WKB (binary, including any holes)
         BOUNDARY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        with open(BOUNDARY_CACHE_FILE, 'w') as f:
-            json.dump({
-                'coordinates': list(polygon.exterior.coords),
-                'source': 'NYC Open Data'
-            }, f, indent=2)
+        BOUNDARY_CACHE_FILE.write_bytes(shapely.wkb.dumps(polygon))
         print(f"✅ Loaded Manhattan boundary ({len(polygon.exterior.coords)} points)")
         return polygon
     else:
-        print("❌ Could not extract Manhattan polygon from GeoJSON")
+        logger.error("Could not extract Manhattan polygon from GeoJSON")
         return None
 
 
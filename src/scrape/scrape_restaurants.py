@@ -6,33 +6,49 @@ Uses a grid strategy to query Google Places API and collect all restaurants
 in Manhattan, including reviews and AI-generated summaries.
 """
 
+import heapq
 import os
-import json
+import random
+import orjson
 import time
 import asyncio
-import math
+import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
-import sys
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Any
+from urllib.parse import urlsplit
+from dataclasses import dataclass, field
+from functools import lru_cache
 from dotenv import load_dotenv
 from tqdm.asyncio import tqdm
-from shapely.geometry import Point, Polygon
-from load_manhattan_boundary import load_manhattan_boundary
+
+# numpy, shapely, zstandard and the boundary loader are imported by the
+# functions that use them, so importing this module (e.g. for its helpers)
+# doesn't load them
+if TYPE_CHECKING:
+    import numpy as np
+    from shapely.geometry import Polygon
 
 try:
     from google.maps import places_v1
     from google.type import latlng_pb2
-    from google.geo.type import types as geo_types
+    from google.protobuf.json_format import MessageToDict
 except ImportError:
     print("Error: google-maps-places package not installed.")
     print("Install it with: pip install google-maps-places")
     exit(1)
 
 # Configuration
-GRID_SIZE = 250  # 100x100 = 10000 cells (finer granularity for better coverage)
-SLEEP_TIME = 30  # seconds between grid cell searches
+GRID_SIZE = int(os.getenv("GRID_SIZE", "250"))  # GRID_SIZE x GRID_SIZE base cells
+# Adaptive refinement: a cell whose search came back full (every page had
+# NEARBY_PAGE_SIZE places, so the API likely capped it) is split into 4
+# sub-cells, up to GRID_REFINE_MAX_DEPTH times. With it a coarse GRID_SIZE
+# still covers dense areas, without spending calls on empty ones. On by
+# default only for coarse grids: fine-grid cells that still come back full
+# are too dense for splitting to pay off
+GRID_REFINE = os.getenv("GRID_REFINE", "1" if GRID_SIZE <= 20 else "0") == "1"
+GRID_REFINE_MAX_DEPTH = int(os.getenv("GRID_REFINE_MAX_DEPTH", "3"))
+NEARBY_PAGE_SIZE = 20
 
 # Manhattan bounding box (for grid generation - will be filtered by polygon)
 MANHATTAN_BOUNDS = {
@@ -45,19 +61,26 @@ MANHATTAN_BOUNDS = {
 # Manhattan polygon boundary - loaded from official NYC Open Data
 # This will be loaded at runtime using load_manhattan_boundary()
 # Falls back to approximate polygon if download fails
-def _get_manhattan_polygon() -> Polygon:
+def _get_manhattan_polygon() -> "Polygon":
     """Load Manhattan boundary polygon from official NYC Open Data or use fallback."""
-    global MANHATTAN_POLYGON
+    global MANHATTAN_POLYGON, MANHATTAN_POLYGON_BOUNDS
     
     if MANHATTAN_POLYGON is not None:
         return MANHATTAN_POLYGON
     
+    import shapely
+    from load_manhattan_boundary import load_manhattan_boundary
+    
     # Try to load from official source
     try:
         print("Loading Manhattan boundary from NYC Open Data...")
         polygon = load_manhattan_boundary()
         if polygon is not None:
+            # Prepare once for the many point/cell queries (no-op if the loader
+            # already prepared it)
+            shapely.prepare(polygon)
             MANHATTAN_POLYGON = polygon
+            MANHATTAN_POLYGON_BOUNDS = polygon.bounds
             print(f"✅ Loaded official Manhattan boundary ({len(polygon.exterior.coords)} points)")
             return polygon
         else:
@@ -68,32 +91,204 @@ def _get_manhattan_polygon() -> Polygon:
     return MANHATTAN_POLYGON
 
 # Initialize as None, will be loaded on first access
-MANHATTAN_POLYGON: Optional[Polygon] = None
+MANHATTAN_POLYGON: Optional["Polygon"] = None
+# (minx, miny, maxx, maxy) of MANHATTAN_POLYGON, for pure-float early outs
+MANHATTAN_POLYGON_BOUNDS: Optional[Tuple[float, float, float, float]] = None
 MAX_REVIEWS = 10
-DETAILS_DELAY = 0.1  # seconds between Place Details calls
+# Request rates (per second) for each Places endpoint, enforced by token buckets
+NEARBY_RPS = float(os.getenv("NEARBY_RPS", "10"))
+DETAILS_RPS = float(os.getenv("DETAILS_RPS", "10"))
+# Adaptive rate bounds: never throttle below RATE_FLOOR_RPS after 429s, and
+# regain RATE_RECOVERY_STEP requests/second per successful request
+RATE_FLOOR_RPS = 0.5
+RATE_RECOVERY_STEP = 0.1
+# A request that hits a rate limit is retried up to RATE_LIMIT_MAX_ATTEMPTS
+# times, backing off RATE_LIMIT_BACKOFF * 2**attempt seconds (capped at
+# RATE_LIMIT_MAX_BACKOFF, plus jitter); the limiter's rate drop is what slows
+# everyone else down
+RATE_LIMIT_BACKOFF = 2.0
+RATE_LIMIT_MAX_BACKOFF = 60.0
+RATE_LIMIT_MAX_ATTEMPTS = 5
+# Grid and details caches live in one SQLite file; the per-file JSON caches
+# below are still read (never written) so earlier runs' results are reused
+CACHE_DB_FILE = Path("cache/scrape_cache.sqlite")
 CACHE_GRID_DIR = Path("cache/grid")
 CACHE_DETAILS_DIR = Path("cache/details")
+# Cache entries are buffered in memory and written in one transaction per this many
+CACHE_FLUSH_EVERY = 100
 OUTPUT_FILE = "manhattan_restaurants.json"
-# Concurrency limits to avoid hitting rate limits
-MAX_CONCURRENT_GRID_SEARCHES = 10  # Concurrent grid cell searches
-MAX_CONCURRENT_DETAILS = 20  # Concurrent Place Details requests
+# Columnar copy of the output for analysis; written only when pyarrow is
+# installed (set OUTPUT_PARQUET_FILE to an empty string to skip it)
+OUTPUT_PARQUET_FILE = os.getenv("OUTPUT_PARQUET_FILE", "manhattan_restaurants.parquet")
+# Worker counts for each phase. Request rates are set by the token buckets
+# (NEARBY_RPS / DETAILS_RPS), so these only need to cover rate x latency,
+# plus workers parked on cache hits or on a chain's shared details fetch
+MAX_CONCURRENT_GRID_SEARCHES = int(os.getenv("MAX_CONCURRENT_GRID_SEARCHES", "64"))  # Concurrent grid cell searches
+MAX_CONCURRENT_DETAILS = int(os.getenv("MAX_CONCURRENT_DETAILS", "128"))  # Concurrent Place Details requests
+ENRICH_QUEUE_SIZE = 1000  # Restaurants found in Phase 1 waiting for Phase 2
+# Chain locations (same name and website) fetch CHAIN_SHARED_KEYS once and
+# copy them; each location still fetches its own reviews with
+# CHAIN_LOCATION_DETAILS_FIELDS. Off by default: which location fetches the
+# shared keys depends on scheduling
+SHARE_CHAIN_DETAILS = os.getenv("SHARE_CHAIN_DETAILS", "0") == "1"
+CHAIN_SHARED_KEYS = ('generativeSummary',)
+# Hosts that serve many unrelated restaurants (social profiles, link pages,
+# ordering and reservation platforms); their websites never identify a chain
+GENERIC_WEBSITE_HOSTS = frozenset({
+    "instagram.com", "facebook.com", "tiktok.com", "twitter.com", "x.com",
+    "linktr.ee", "linkin.bio", "bit.ly", "sites.google.com", "business.site",
+    "yelp.com", "toasttab.com", "order.online", "doordash.com", "ubereats.com",
+    "grubhub.com", "seamless.com", "chownow.com", "slicelife.com", "menufy.com",
+    "square.site", "squareup.com", "clover.com", "opentable.com", "resy.com",
+})
+# gRPC channel for the shared Places client: no message size limits (the
+# generated transport's defaults) plus keepalive pings so the connection
+# survives idle gaps, e.g. while the grid is served from cache
+GRPC_CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.enable_retries", 1),
+]
+# Seconds to wait for the channel's TLS/HTTP2 handshake before the first phase
+CHANNEL_READY_TIMEOUT = 10.0
 
 # Field mask for searchNearby (nextPageToken is not a valid field path, it's returned automatically)
 NEARBY_SEARCH_FIELDS = "places.id,places.displayName,places.formattedAddress,places.location,places.types,places.rating,places.userRatingCount,places.priceLevel,places.websiteUri,places.nationalPhoneNumber,places.businessStatus,places.reviewSummary"
 PLACE_DETAILS_FIELDS = "id,displayName,reviews,generativeSummary,reviewSummary"
+CHAIN_LOCATION_DETAILS_FIELDS = "id,displayName,reviews,reviewSummary"
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """Check whether a Places API error is a 429 / RESOURCE_EXHAUSTED."""
+    error_str = str(e)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+class TokenBucket:
+    """Async token bucket limiter: `rate` requests per second, bursting up to `capacity`.
+
+    Usage: `async with bucket:` around each request. Spreads requests evenly at
+    the quota instead of bursting into 429s and then sleeping.
+
+    The rate adapts to the API: a rate-limit error raised inside the block
+    halves it (down to RATE_FLOOR_RPS), and each success steps it back up by
+    RATE_RECOVERY_STEP toward the configured rate. Waiters sleep on a
+    Condition, so a rate change wakes them to re-check against the new rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = asyncio.Condition()
+
+    def _refill(self):
+        """Add the tokens earned since the last refill (caller holds the condition)."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # Sleep until the next token is due, or until resize() changes the rate
+                try:
+                    await asyncio.wait_for(self._cond.wait(), (1 - self._tokens) / self.rate)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def resize(self, rate: float):
+        """Change the refill rate and wake waiters to re-check against it."""
+        async with self._cond:
+            self._refill()
+            self.rate = rate
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is None:
+            if self.rate < self.max_rate:
+                await self.resize(min(self.max_rate, self.rate + RATE_RECOVERY_STEP))
+        elif is_rate_limit_error(exc):
+            await self.resize(max(RATE_FLOOR_RPS, self.rate / 2))
+        return False
+
+
+def _retry_delay(e: BaseException) -> Optional[float]:
+    """Server-suggested retry delay in seconds (google.rpc.RetryInfo), if the error carries one."""
+    for detail in getattr(e, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+
+async def with_retry(limiter: TokenBucket, fn, *args, max_attempts: int = RATE_LIMIT_MAX_ATTEMPTS, **kwargs):
+    """Call `await fn(*args, **kwargs)` under `limiter`, retrying rate-limit errors.
+
+    Backs off exponentially with jitter, or for the server's RetryInfo delay
+    when it sends one. The sleep happens outside the limiter block, so other
+    requests keep going; the last attempt's error is raised.
+    """
+    for attempt in range(max_attempts):
+        try:
+            async with limiter:
+                return await fn(*args, **kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_attempts - 1:
+                raise
+            backoff = min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_BACKOFF * 2 ** attempt)
+            await asyncio.sleep(min(_retry_delay(e) or backoff, RATE_LIMIT_MAX_BACKOFF) + random.random() * 0.25)
+
+
+NEARBY_LIMITER = TokenBucket(NEARBY_RPS)
+DETAILS_LIMITER = TokenBucket(DETAILS_RPS)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GridCell:
-    """Represents a grid cell with bounding coordinates."""
+    """Represents a grid cell with bounding coordinates.
+
+    Cells are generated as coordinate arrays (see generate_grid_cells) and only
+    the ones overlapping Manhattan become GridCell objects; slots keep each one
+    to its fields without a per-instance __dict__. Cells are immutable and
+    hashable, so they can be used as dict keys and set members.
+    """
     lat_low: float
     lon_low: float
     lat_high: float
     lon_high: float
+    # Search circle, precomputed for the whole grid in generate_grid_cells
+    center_lat: float = 0.0
+    center_lon: float = 0.0
+    radius_meters: int = 0
+    # Times this cell was subdivided from a base grid cell
+    depth: int = 0
+    # Cache key, formatted once when the cell is built
+    _cache_filename: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, '_cache_filename', f"{self.lat_low}_{self.lon_low}_{self.lat_high}_{self.lon_high}.json"
+        )
 
     def cache_filename(self) -> str:
-        """Generate cache filename from cell coordinates."""
-        return f"{self.lat_low}_{self.lon_low}_{self.lat_high}_{self.lon_high}.json"
+        """Cache filename from cell coordinates (formatted in __post_init__)."""
+        return self._cache_filename
 
 
 def load_env() -> str:
@@ -110,8 +305,95 @@ def load_env() -> str:
 
 def create_directories():
     """Create cache directories if they don't exist."""
-    CACHE_GRID_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_DETAILS_DIR.mkdir(parents=True, exist_ok=True)
+    CACHE_DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+
+_cache_db: Optional[sqlite3.Connection] = None
+# Separate connection used only by flushes in worker threads; WAL lets the
+# event loop keep reading through _cache_db while a flush is writing
+_cache_writer: Optional[sqlite3.Connection] = None
+# Encoded entries not yet written, keyed by (table, key column) then key
+_pending_writes: Dict[Tuple[str, str], Dict[str, bytes]] = {}
+_pending_count = 0
+_flush_lock = asyncio.Lock()
+# Cache blobs are zstd-compressed JSON (review text compresses ~5x). Entries
+# written before compression are plain JSON and are told apart by the zstd
+# frame magic
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+@lru_cache(maxsize=1)
+def _zstd():
+    """(compressor, decompressor) for cache blobs, created on first use; only used from the event loop thread."""
+    import zstandard
+    return zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+
+
+def get_cache_db() -> sqlite3.Connection:
+    """Open the scrape cache database on first use (one connection per process)."""
+    global _cache_db, _cache_writer
+    if _cache_db is None:
+        CACHE_DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _cache_db = sqlite3.connect(CACHE_DB_FILE)
+        # WAL + NORMAL sync: each save is a cheap append instead of a full fsync
+        _cache_db.execute("PRAGMA journal_mode=WAL")
+        _cache_db.execute("PRAGMA synchronous=NORMAL")
+        _cache_db.execute("CREATE TABLE IF NOT EXISTS grid (key TEXT PRIMARY KEY, json BLOB NOT NULL)")
+        _cache_db.execute("CREATE TABLE IF NOT EXISTS details (place_id TEXT PRIMARY KEY, json BLOB NOT NULL)")
+        _cache_db.commit()
+        _cache_writer = sqlite3.connect(CACHE_DB_FILE, check_same_thread=False)
+        _cache_writer.execute("PRAGMA synchronous=NORMAL")
+    return _cache_db
+
+
+def _cache_get(table: str, key_column: str, key: str) -> Optional[Any]:
+    """Read and decode a cached JSON value, or None if missing or corrupted."""
+    data = _pending_writes.get((table, key_column), {}).get(key)
+    if data is None:
+        row = get_cache_db().execute(f"SELECT json FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data = row[0]
+    import zstandard
+    try:
+        if data[:4] == _ZSTD_MAGIC:
+            data = _zstd()[1].decompress(data)
+        return orjson.loads(data)
+    except (orjson.JSONDecodeError, zstandard.ZstdError):
+        return None
+
+
+async def _cache_put(table: str, key_column: str, key: str, value: Any):
+    """Encode and buffer a JSON value, flushing once CACHE_FLUSH_EVERY are pending."""
+    global _pending_count
+    # Compact orjson bytes; the cache is only read back by this script
+    _pending_writes.setdefault((table, key_column), {})[key] = _zstd()[0].compress(orjson.dumps(value))
+    _pending_count += 1
+    if _pending_count >= CACHE_FLUSH_EVERY:
+        await flush_cache_writes()
+
+
+async def flush_cache_writes():
+    """Write all buffered cache entries in one transaction, off the event loop."""
+    global _pending_count
+    async with _flush_lock:
+        if not _pending_writes:
+            return
+        get_cache_db()
+        batch = dict(_pending_writes)
+        _pending_writes.clear()
+        _pending_count = 0
+        await asyncio.to_thread(_write_cache_batch, batch)
+
+
+def _write_cache_batch(batch: Dict[Tuple[str, str], Dict[str, bytes]]):
+    """Insert or replace a batch of encoded entries (runs in a worker thread)."""
+    with _cache_writer:
+        for (table, key_column), rows in batch.items():
+            _cache_writer.executemany(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, json) VALUES (?, ?)",
+                rows.items(),
+            )
 
 
 def point_in_manhattan(lat: float, lon: float) -> bool:
@@ -119,47 +401,34 @@ def point_in_manhattan(lat: float, lon: float) -> bool:
     Check if a point (latitude, longitude) is within Manhattan polygon.
     Uses shapely for accurate polygon intersection.
     """
+    # Only used for one-off checks, so shapely's Point isn't imported at startup
+    from shapely.geometry import Point
+
     polygon = _get_manhattan_polygon()
     point = Point(lon, lat)  # Shapely uses (x, y) = (lon, lat)
-    return polygon.contains(point) or polygon.touches(point)
+    # For a point, intersects == contains or touches, in one prepared query
+    return polygon.intersects(point)
 
 
 def cell_overlaps_manhattan(cell: GridCell) -> bool:
     """
     Check if a grid cell overlaps with Manhattan polygon.
-    A cell overlaps if any of its corners or center is within Manhattan.
+    A cell overlaps if any part of it (corners, center or edges) touches Manhattan.
     """
-    # Check cell center
-    center_lat = (cell.lat_low + cell.lat_high) / 2
-    center_lon = (cell.lon_low + cell.lon_high) / 2
-    if point_in_manhattan(center_lat, center_lon):
-        return True
-    
-    # Check all four corners
-    corners = [
-        (cell.lat_low, cell.lon_low),   # SW corner
-        (cell.lat_low, cell.lon_high),  # SE corner
-        (cell.lat_high, cell.lon_low),  # NW corner
-        (cell.lat_high, cell.lon_high), # NE corner
-    ]
+    polygon = _get_manhattan_polygon()
     
-    for lat, lon in corners:
-        if point_in_manhattan(lat, lon):
-            return True
+    # Cells outside the polygon's bounding box can't overlap it; most of the
+    # grid (New Jersey, Brooklyn, Queens) is rejected with float comparisons
+    minx, miny, maxx, maxy = MANHATTAN_POLYGON_BOUNDS
+    if cell.lon_high < minx or cell.lon_low > maxx or cell.lat_high < miny or cell.lat_low > maxy:
+        return False
     
-    # Also check if any edge of the cell intersects with Manhattan polygon
-    # Create a polygon for the cell
-    cell_polygon = Polygon([
-        (cell.lon_low, cell.lat_low),   # SW
-        (cell.lon_high, cell.lat_low),  # SE
-        (cell.lon_high, cell.lat_high), # NE
-        (cell.lon_low, cell.lat_high),  # NW
-        (cell.lon_low, cell.lat_low),   # Close polygon
-    ])
+    from shapely.geometry import box
     
-    # Check if cell polygon intersects Manhattan polygon
-    polygon = _get_manhattan_polygon()
-    return cell_polygon.intersects(polygon)
+    # A single intersects test covers the center, corner and edge checks
+    # (the polygon is prepared by load_manhattan_boundary)
+    cell_polygon = box(cell.lon_low, cell.lat_low, cell.lon_high, cell.lat_high)
+    return polygon.intersects(cell_polygon)
 
 
 def generate_grid_cells() -> List[GridCell]:
@@ -168,90 +437,194 @@ def generate_grid_cells() -> List[GridCell]:
     Only includes cells that overlap with Manhattan bounds to avoid
     querying areas outside Manhattan (like New Jersey, other boroughs).
     """
-    all_cells = []
+    import numpy as np
+    import shapely
+    
     lat_step = (MANHATTAN_BOUNDS["lat_high"] - MANHATTAN_BOUNDS["lat_low"]) / GRID_SIZE
     lon_step = (MANHATTAN_BOUNDS["lon_high"] - MANHATTAN_BOUNDS["lon_low"]) / GRID_SIZE
 
-    # Generate all possible cells in the grid
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            lat_low = MANHATTAN_BOUNDS["lat_low"] + i * lat_step
-            lat_high = MANHATTAN_BOUNDS["lat_low"] + (i + 1) * lat_step
-            lon_low = MANHATTAN_BOUNDS["lon_low"] + j * lon_step
-            lon_high = MANHATTAN_BOUNDS["lon_low"] + (j + 1) * lon_step
-
-            cell = GridCell(
-                lat_low=lat_low,
-                lon_low=lon_low,
-                lat_high=lat_high,
-                lon_high=lon_high
-            )
-            
-            # Only include cells that overlap with Manhattan
-            if cell_overlaps_manhattan(cell):
-                all_cells.append(cell)
+    # Generate all possible cells in the grid as coordinate arrays (row i, column j).
+    # Same float arithmetic as per-cell Python, so cache filenames are unchanged
+    i, j = np.meshgrid(np.arange(GRID_SIZE), np.arange(GRID_SIZE), indexing='ij')
+    lat_low = (MANHATTAN_BOUNDS["lat_low"] + i * lat_step).ravel()
+    lat_high = (MANHATTAN_BOUNDS["lat_low"] + (i + 1) * lat_step).ravel()
+    lon_low = (MANHATTAN_BOUNDS["lon_low"] + j * lon_step).ravel()
+    lon_high = (MANHATTAN_BOUNDS["lon_low"] + (j + 1) * lon_step).ravel()
+
+    # Only include cells that overlap with Manhattan, using vectorized GEOS calls
+    # instead of a Python-level call per cell:
+    # 1. cells outside the polygon's bounding box are rejected with float comparisons
+    # 2. a cell with any corner inside the polygon overlaps it (cheap point tests,
+    #    true for most cells in the interior)
+    # 3. only the remaining boundary cells get a full box intersects test
+    polygon = _get_manhattan_polygon()
+    minx, miny, maxx, maxy = MANHATTAN_POLYGON_BOUNDS
+    candidates = np.flatnonzero((lon_high >= minx) & (lon_low <= maxx) & (lat_high >= miny) & (lat_low <= maxy))
+    
+    corner_inside = np.zeros(candidates.size, dtype=bool)
+    for xs, ys in ((lon_low, lat_low), (lon_high, lat_low), (lon_low, lat_high), (lon_high, lat_high)):
+        corner_inside |= shapely.contains_xy(polygon, xs[candidates], ys[candidates])
+    
+    boundary = candidates[~corner_inside]
+    overlaps = np.zeros(lat_low.size, dtype=bool)
+    overlaps[candidates[corner_inside]] = True
+    overlaps[boundary] = shapely.intersects(
+        polygon,
+        shapely.box(lon_low[boundary], lat_low[boundary], lon_high[boundary], lat_high[boundary]),
+    )
+
+    all_cells = _cells_from_bounds(lat_low[overlaps], lon_low[overlaps], lat_high[overlaps], lon_high[overlaps])
 
     print(f"Generated {len(all_cells)} cells overlapping Manhattan (out of {GRID_SIZE * GRID_SIZE} total grid cells)")
     return all_cells
 
 
-def load_grid_cache(cell: GridCell) -> Optional[List[Dict]]:
+def _cells_from_bounds(
+    lat_low: "np.ndarray",
+    lon_low: "np.ndarray",
+    lat_high: "np.ndarray",
+    lon_high: "np.ndarray",
+    depth: int = 0
+) -> List[GridCell]:
+    """Build GridCells, with their search circles, from arrays of cell bounds."""
+    import numpy as np
+    
+    # Search circle per cell, centered on the cell. The radius must be >= the
+    # distance from the center to the farthest corner (diagonal/2) AND >= the
+    # distance to adjacent cell centers, so use the full diagonal plus a 100m
+    # buffer, halved with each subdivision so sub-cells' circles shrink with them.
+    # 1 degree latitude ≈ 111km, 1 degree longitude ≈ 111km * cos(latitude)
+    center_lat = (lat_low + lat_high) / 2
+    center_lon = (lon_low + lon_high) / 2
+    lat_meters = (lat_high - lat_low) * 111000
+    lon_meters = (lon_high - lon_low) * 111000 * np.cos(np.radians(center_lat))
+    radius_meters = (np.sqrt(lat_meters**2 + lon_meters**2) + 100 / 2**depth).astype(np.int64)
+    # Cap radius at 50km (API limit for nearby search)
+    radius_meters = np.minimum(radius_meters, 50000)
+
+    return [
+        GridCell(*cell, depth=depth)
+        for cell in zip(
+            lat_low.tolist(),
+            lon_low.tolist(),
+            lat_high.tolist(),
+            lon_high.tolist(),
+            center_lat.tolist(),
+            center_lon.tolist(),
+            radius_meters.tolist(),
+        )
+    ]
+
+
+def subdivide_cell(cell: GridCell) -> List[GridCell]:
+    """Split a cell into its 4 quadrants, keeping those that overlap Manhattan."""
+    import numpy as np
+    
+    mid_lat = (cell.lat_low + cell.lat_high) / 2
+    mid_lon = (cell.lon_low + cell.lon_high) / 2
+    lat_low = np.array([cell.lat_low, cell.lat_low, mid_lat, mid_lat])
+    lat_high = np.array([mid_lat, mid_lat, cell.lat_high, cell.lat_high])
+    lon_low = np.array([cell.lon_low, mid_lon, cell.lon_low, mid_lon])
+    lon_high = np.array([mid_lon, cell.lon_high, mid_lon, cell.lon_high])
+    sub_cells = _cells_from_bounds(lat_low, lon_low, lat_high, lon_high, depth=cell.depth + 1)
+    return [sub_cell for sub_cell in sub_cells if cell_overlaps_manhattan(sub_cell)]
+
+
+def is_saturated(results: List[Dict]) -> bool:
+    """Check whether a cell's search came back full, i.e. the API likely capped it.
+
+    Every page holds NEARBY_PAGE_SIZE places, so a result count that is a
+    non-zero multiple of it means the last page was full too.
+    """
+    return bool(results) and len(results) % NEARBY_PAGE_SIZE == 0
+
+
+async def load_grid_cache(cell: GridCell) -> Optional[Tuple[List[Dict], bool]]:
     """Load grid cell results from cache if exists.
-    Returns empty list [] if cache exists but is empty (to avoid re-querying).
-    Returns None only if cache file doesn't exist.
+    Returns (results, unfiltered); results is [] if cache exists but is empty
+    (to avoid re-querying). unfiltered is False for entries written before
+    places without a website were cached, whose count says nothing about
+    whether the search was capped.
+    Returns None only if the cell isn't cached.
     """
-    cache_file = CACHE_GRID_DIR / cell.cache_filename()
-    if cache_file.exists():
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
-                # Return cached data (even if empty list) to indicate cache exists
-                return cached_data if isinstance(cached_data, list) else []
-        except (json.JSONDecodeError, IOError):
-            # If cache file is corrupted, treat as not cached
+    cached_data = _cache_get("grid", "key", cell.cache_filename())
+    if cached_data is None:
+        if cell.cache_filename() not in _legacy_cache_names(CACHE_GRID_DIR):
             return None
-    return None
+        cached_data = await asyncio.to_thread(_load_legacy_json, CACHE_GRID_DIR / cell.cache_filename())
+        if cached_data is None:
+            return None
+    # Return cached data (even if empty list) to indicate cache exists
+    if isinstance(cached_data, dict):
+        return cached_data.get('places') or [], True
+    return (cached_data if isinstance(cached_data, list) else []), False
 
 
-def save_grid_cache(cell: GridCell, results: List[Dict]):
+async def save_grid_cache(cell: GridCell, results: List[Dict]):
     """Save grid cell results to cache, even if empty.
-    Empty results are cached to avoid unnecessary API calls.
+    Empty results are cached to avoid unnecessary API calls. Results are
+    wrapped as {"places": [...]} to tell them apart from website-filtered
+    lists written by earlier versions.
     """
-    cache_file = CACHE_GRID_DIR / cell.cache_filename()
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    await _cache_put("grid", "key", cell.cache_filename(), {"places": results})
 
 
-def load_details_cache(place_id: str) -> Optional[Dict]:
+async def load_details_cache(place_id: str) -> Optional[Dict]:
     """Load place details from cache if exists.
     Returns empty dict {} if cache exists but is empty (to avoid re-querying).
-    Returns None only if cache file doesn't exist.
+    Returns None only if the place isn't cached.
     """
-    cache_file = CACHE_DETAILS_DIR / f"{place_id}.json"
-    if cache_file.exists():
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
-                # Check for empty marker
-                if cached_data == {"_empty": True}:
-                    return {}
-                # Return cached data (even if empty dict) to indicate cache exists
-                return cached_data if isinstance(cached_data, dict) else {}
-        except (json.JSONDecodeError, IOError):
-            # If cache file is corrupted, treat as not cached
+    cached_data = _cache_get("details", "place_id", place_id)
+    if cached_data is None:
+        if f"{place_id}.json" not in _legacy_cache_names(CACHE_DETAILS_DIR):
             return None
-    return None
+        cached_data = await asyncio.to_thread(_load_legacy_json, CACHE_DETAILS_DIR / f"{place_id}.json")
+        if cached_data is None:
+            return None
+    # Check for empty marker
+    if cached_data == {"_empty": True}:
+        return {}
+    # Return cached data (even if empty dict) to indicate cache exists
+    return cached_data if isinstance(cached_data, dict) else {}
 
 
-def save_details_cache(place_id: str, details: Optional[Dict]):
+async def save_details_cache(place_id: str, details: Optional[Dict]):
     """Save place details to cache, even if None or empty.
     Empty/None results are cached to avoid unnecessary API calls.
     """
-    cache_file = CACHE_DETAILS_DIR / f"{place_id}.json"
     # Save empty dict with marker if details is None
     data_to_save = details if details is not None else {"_empty": True}
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+    await _cache_put("details", "place_id", place_id, data_to_save)
+
+
+@lru_cache(maxsize=None)
+def _legacy_cache_names(cache_dir: Path) -> frozenset:
+    """List a legacy JSON cache directory once, so misses skip a stat per entry.
+
+    The legacy directories are never written any more, so the listing
+    stays valid for the whole run.
+    """
+    try:
+        with os.scandir(cache_dir) as entries:
+            return frozenset(entry.name for entry in entries if entry.name.endswith(".json"))
+    except FileNotFoundError:
+        return frozenset()
+
+
+def _load_legacy_json(cache_file: Path) -> Optional[Any]:
+    """Read a per-file JSON cache entry from before the SQLite cache, or None.
+
+    Does blocking file I/O; async callers run it with asyncio.to_thread.
+    SQLite lookups stay on the event loop: a primary-key read from the page
+    cache is cheaper than the thread hop.
+    """
+    if not cache_file.exists():
+        return None
+    try:
+        return orjson.loads(cache_file.read_bytes())
+    except (orjson.JSONDecodeError, IOError):
+        # If cache file is corrupted, treat as not cached
+        return None
 
 
 def create_client(api_key: str) -> places_v1.PlacesClient:
@@ -261,55 +634,82 @@ def create_client(api_key: str) -> places_v1.PlacesClient:
 
 
 def create_async_client(api_key: str) -> places_v1.PlacesAsyncClient:
-    """Create and configure Places API async client with API key."""
-    client_options = {"api_key": api_key}
-    return places_v1.PlacesAsyncClient(client_options=client_options)
+    """Create and configure Places API async client with API key.
+
+    Both phases share this client's single HTTP/2 channel. It is built
+    explicitly so it can be kept alive between bursts of requests instead of
+    reconnecting when the pipeline goes quiet.
+    """
+    from google.auth import api_key as api_key_credentials
+    from google.maps.places_v1.services.places.transports import PlacesGrpcAsyncIOTransport
+
+    credentials = api_key_credentials.Credentials(api_key)
+    channel = PlacesGrpcAsyncIOTransport.create_channel(
+        credentials=credentials,
+        options=GRPC_CHANNEL_OPTIONS,
+    )
+    transport = PlacesGrpcAsyncIOTransport(credentials=credentials, channel=channel)
+    return places_v1.PlacesAsyncClient(transport=transport)
+
+
+async def warm_up_client(client: places_v1.PlacesAsyncClient):
+    """Connect the client's channel up front.
+
+    Otherwise the first burst of requests all wait on the lazily opened
+    connection's handshake. A failure here is only logged: the channel keeps
+    trying to connect on the first request.
+    """
+    try:
+        await asyncio.wait_for(client.transport.grpc_channel.channel_ready(), CHANNEL_READY_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️  Places API channel not ready after {CHANNEL_READY_TIMEOUT:.0f}s: {e!r}")
+
+
+# Keys kept from the JSON form of each message (MessageToDict uses the camelCase
+# JSON names and omits unset fields)
+PLACE_KEYS = ('id', 'displayName', 'formattedAddress', 'location', 'types', 'rating',
+              'userRatingCount', 'priceLevel', 'websiteUri', 'nationalPhoneNumber', 'businessStatus')
+# MessageToDict omits unset and default-valued fields; these keys are always
+# written (with the proto default, or None for an unset enum) so every place
+# has the same schema. displayName and location are only written when set
+PLACE_DEFAULTS = {
+    'id': '', 'formattedAddress': '', 'types': (), 'rating': 0.0, 'userRatingCount': 0,
+    'priceLevel': None, 'websiteUri': '', 'nationalPhoneNumber': '', 'businessStatus': None,
+}
+REVIEW_SUMMARY_KEYS = ('text', 'reviewsUri', 'disclosureText')
+REVIEW_KEYS = ('rating', 'text', 'authorAttribution', 'publishTime')
+AUTHOR_KEYS = ('displayName', 'uri', 'photoUri')
+GENERATIVE_SUMMARY_KEYS = ('overview', 'description')
+
+
+def _pick(data: Dict, keys: Tuple[str, ...]) -> Dict:
+    """Keep only the given keys of a MessageToDict result."""
+    return {key: data[key] for key in keys if key in data}
+
+
+def _review_summary_to_dict(place_pb) -> Optional[Dict]:
+    """Convert a raw Place message's review summary, or None if it has none."""
+    if not place_pb.HasField('review_summary'):
+        return None
+    return _pick(MessageToDict(place_pb.review_summary), REVIEW_SUMMARY_KEYS)
 
 
 def _convert_place_to_dict(place) -> Dict:
     """Convert a Place protobuf object to a dictionary."""
+    # One MessageToDict call on the raw protobuf instead of per-field
+    # attribute access through the proto-plus wrapper
+    place_pb = places_v1.Place.pb(place)
+    fields = MessageToDict(place_pb)
     place_dict = {}
-    if hasattr(place, 'id'):
-        place_dict['id'] = place.id
-    if hasattr(place, 'display_name') and place.display_name:
-        place_dict['displayName'] = {
-            'text': place.display_name.text,
-            'languageCode': place.display_name.language_code
-        }
-    if hasattr(place, 'formatted_address'):
-        place_dict['formattedAddress'] = place.formatted_address
-    if hasattr(place, 'location') and place.location:
-        place_dict['location'] = {
-            'latitude': place.location.latitude,
-            'longitude': place.location.longitude
-        }
-    if hasattr(place, 'types'):
-        place_dict['types'] = list(place.types)
-    if hasattr(place, 'rating'):
-        place_dict['rating'] = place.rating
-    if hasattr(place, 'user_rating_count'):
-        place_dict['userRatingCount'] = place.user_rating_count
-    if hasattr(place, 'price_level'):
-        place_dict['priceLevel'] = place.price_level.name if place.price_level else None
-    if hasattr(place, 'website_uri'):
-        place_dict['websiteUri'] = place.website_uri
-    if hasattr(place, 'national_phone_number'):
-        place_dict['nationalPhoneNumber'] = place.national_phone_number
-    if hasattr(place, 'business_status'):
-        place_dict['businessStatus'] = place.business_status.name if place.business_status else None
-    if hasattr(place, 'review_summary') and place.review_summary:
-        rs = place.review_summary
-        place_dict['reviewSummary'] = {
-            'text': {
-                'text': rs.text.text if rs.text else '',
-                'languageCode': rs.text.language_code if rs.text else 'en'
-            } if rs.text else None,
-            'reviewsUri': rs.reviews_uri if hasattr(rs, 'reviews_uri') else None,
-            'disclosureText': {
-                'text': rs.disclosure_text.text if rs.disclosure_text else '',
-                'languageCode': rs.disclosure_text.language_code if rs.disclosure_text else 'en'
-            } if hasattr(rs, 'disclosure_text') and rs.disclosure_text else None
-        }
+    for key in PLACE_KEYS:
+        if key in fields:
+            place_dict[key] = fields[key]
+        elif key in PLACE_DEFAULTS:
+            default = PLACE_DEFAULTS[key]
+            place_dict[key] = list(default) if isinstance(default, tuple) else default
+    review_summary = _review_summary_to_dict(place_pb)
+    if review_summary:
+        place_dict['reviewSummary'] = review_summary
     return place_dict
 
 
@@ -330,31 +730,13 @@ async def search_by_type_async(
     max_pages = 3  # API allows up to 3 pages (60 results total)
 
     try:
-        # Calculate center point of the cell
-        center_lat = (cell.lat_low + cell.lat_high) / 2
-        center_lon = (cell.lon_low + cell.lon_high) / 2
-        
+        # Center point and radius were precomputed for the whole grid
+        # (see generate_grid_cells)
         center_point = latlng_pb2.LatLng(
-            latitude=center_lat,
-            longitude=center_lon
+            latitude=cell.center_lat,
+            longitude=cell.center_lon
         )
-        
-        # Calculate radius to cover the entire cell and ensure overlap with adjacent cells
-        # Radius must be >= distance from cell center to farthest corner (diagonal/2)
-        # AND >= distance to adjacent cell centers to ensure full coverage overlap
-        lat_diff = cell.lat_high - cell.lat_low
-        lon_diff = cell.lon_high - cell.lon_low
-        # Convert to meters: 1 degree latitude ≈ 111km, 1 degree longitude ≈ 111km * cos(latitude)
-        lat_meters = lat_diff * 111000
-        lon_meters = lon_diff * 111000 * math.cos(math.radians(center_lat))
-        # Use diagonal distance (covers entire cell) plus buffer for overlap
-        # This ensures radius >= distance to adjacent cell centers (diagonal distance)
-        cell_diagonal = math.sqrt(lat_meters**2 + lon_meters**2)
-        radius_meters = int(cell_diagonal + 100)  # 100m buffer ensures overlap
-        
-        # Cap radius at 50km (API limit for nearby search)
-        # Note: For 20x20 grid, cell diagonal ≈ 1181m, so radius ≈ 1281m (well below limit)
-        radius_meters = min(radius_meters, 50000)
+        radius_meters = cell.radius_meters
 
         while page_num <= max_pages:
             # Build request
@@ -379,28 +761,24 @@ async def search_by_type_async(
                 )
 
             # Make async request with field mask (nextPageToken is returned automatically, not in field mask)
-            response = await client.search_nearby(
+            response = await with_retry(
+                NEARBY_LIMITER,
+                client.search_nearby,
                 request=request,
                 metadata=[("x-goog-fieldmask", NEARBY_SEARCH_FIELDS)]
             )
 
-            # Convert protobuf response to dict and filter to only restaurants with websiteUri
-            page_results = []
-            if hasattr(response, 'places') and response.places:
-                for place in response.places:
-                    place_dict = _convert_place_to_dict(place)
-                    # Only include restaurants that have a websiteUri
-                    if place_dict.get('websiteUri') or place_dict.get('website_uri'):
-                        page_results.append(place_dict)
+            # Convert protobuf response to dicts. Places without a websiteUri
+            # are kept (and cached) so the result count shows whether the
+            # search was capped; the grid phase filters them out
+            page_results = [_convert_place_to_dict(place) for place in response.places]
             
             all_results.extend(page_results)
             
-            # Check for next page token (try both snake_case and camelCase attribute names)
-            next_page_token = None
-            if hasattr(response, 'next_page_token') and response.next_page_token:
-                next_page_token = response.next_page_token
-            elif hasattr(response, 'nextPageToken') and response.nextPageToken:
-                next_page_token = response.nextPageToken
+            # Check for next page token (empty when unset). Not every
+            # google-maps-places release defines the field on
+            # SearchNearbyResponse, so fall back to no more pages
+            next_page_token = getattr(response, 'next_page_token', None) or None
             
             if next_page_token:
                 page_num += 1
@@ -413,10 +791,8 @@ async def search_by_type_async(
                 break
 
     except Exception as e:
-        error_str = str(e)
-        if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-            print(f"\nRate limit hit, waiting {SLEEP_TIME} seconds...")
-            await asyncio.sleep(SLEEP_TIME)
+        if is_rate_limit_error(e):
+            print(f"\nRate limit hit for cell {cell.cache_filename()} after {RATE_LIMIT_MAX_ATTEMPTS} attempts, nearby search rate now {NEARBY_LIMITER.rate:.1f}/s")
         else:
             print(f"\nError in search_by_type_async for cell {cell.cache_filename()}: {e}")
 
@@ -425,7 +801,8 @@ async def search_by_type_async(
 
 async def get_place_details_async(
     client: places_v1.PlacesAsyncClient,
-    place_id: str
+    place_id: str,
+    fields: str = PLACE_DETAILS_FIELDS
 ) -> Optional[Dict]:
     """Get place details including reviews and AI summaries."""
     try:
@@ -435,98 +812,49 @@ async def get_place_details_async(
         )
 
         # Make async request with field mask
-        response = await client.get_place(
+        response = await with_retry(
+            DETAILS_LIMITER,
+            client.get_place,
             request=request,
-            metadata=[("x-goog-fieldmask", PLACE_DETAILS_FIELDS)]
+            metadata=[("x-goog-fieldmask", fields)]
         )
 
         details = {}
+        response_pb = places_v1.Place.pb(response)
 
         # Extract reviews (limit to most recent MAX_REVIEWS)
-        if hasattr(response, 'reviews') and response.reviews:
-            reviews_list = []
-            # Sort by publish time (most recent first) if available
-            def get_publish_time(review):
-                if hasattr(review, 'publish_time') and review.publish_time:
-                    # Convert protobuf timestamp to sortable string
-                    try:
-                        return review.publish_time.seconds if hasattr(review.publish_time, 'seconds') else 0
-                    except:
-                        return 0
-                return 0
-            
-            sorted_reviews = sorted(
-                response.reviews,
-                key=get_publish_time,
-                reverse=True
+        if response_pb.reviews:
+            # Most recent first (unset timestamps are 0); only the newest
+            # MAX_REVIEWS are selected, not the whole list sorted
+            sorted_reviews = heapq.nlargest(
+                MAX_REVIEWS,
+                response_pb.reviews,
+                key=lambda review: (review.publish_time.seconds, review.publish_time.nanos)
             )
-            for review in sorted_reviews[:MAX_REVIEWS]:
-                review_dict = {}
-                if hasattr(review, 'rating'):
-                    review_dict['rating'] = review.rating
-                if hasattr(review, 'text') and review.text:
-                    review_dict['text'] = {
-                        'text': review.text.text,
-                        'languageCode': review.text.language_code
-                    }
-                if hasattr(review, 'author_attribution') and review.author_attribution:
-                    author = review.author_attribution
-                    review_dict['authorAttribution'] = {
-                        'displayName': author.display_name if hasattr(author, 'display_name') else None,
-                        'uri': author.uri if hasattr(author, 'uri') else None,
-                        'photoUri': author.photo_uri if hasattr(author, 'photo_uri') else None
-                    }
-                if hasattr(review, 'publish_time') and review.publish_time:
-                    # Convert protobuf timestamp to ISO format string
-                    try:
-                        from google.protobuf.timestamp_pb2 import Timestamp
-                        if isinstance(review.publish_time, Timestamp):
-                            dt = datetime.fromtimestamp(review.publish_time.seconds + review.publish_time.nanos / 1e9)
-                            review_dict['publishTime'] = dt.isoformat() + 'Z'
-                        else:
-                            review_dict['publishTime'] = str(review.publish_time)
-                    except:
-                        review_dict['publishTime'] = str(review.publish_time)
+            reviews_list = []
+            for review in sorted_reviews:
+                review_dict = _pick(MessageToDict(review), REVIEW_KEYS)
+                if 'authorAttribution' in review_dict:
+                    review_dict['authorAttribution'] = _pick(review_dict['authorAttribution'], AUTHOR_KEYS)
                 reviews_list.append(review_dict)
             details['reviews'] = reviews_list
 
         # Extract generative summary
-        if hasattr(response, 'generative_summary') and response.generative_summary:
-            gen_summary = response.generative_summary
-            details['generativeSummary'] = {}
-            if hasattr(gen_summary, 'overview') and gen_summary.overview:
-                details['generativeSummary']['overview'] = {
-                    'text': gen_summary.overview.text,
-                    'languageCode': gen_summary.overview.language_code
-                }
-            if hasattr(gen_summary, 'description') and gen_summary.description:
-                details['generativeSummary']['description'] = {
-                    'text': gen_summary.description.text,
-                    'languageCode': gen_summary.description.language_code
-                }
+        if response_pb.HasField('generative_summary'):
+            details['generativeSummary'] = _pick(
+                MessageToDict(response_pb.generative_summary), GENERATIVE_SUMMARY_KEYS
+            )
 
         # Extract review summary (if not already from Text Search)
-        if hasattr(response, 'review_summary') and response.review_summary:
-            rs = response.review_summary
-            details['reviewSummary'] = {
-                'text': {
-                    'text': rs.text.text if rs.text else '',
-                    'languageCode': rs.text.language_code if rs.text else 'en'
-                } if rs.text else None,
-                'reviewsUri': rs.reviews_uri if hasattr(rs, 'reviews_uri') else None,
-                'disclosureText': {
-                    'text': rs.disclosure_text.text if rs.disclosure_text else '',
-                    'languageCode': rs.disclosure_text.language_code if rs.disclosure_text else 'en'
-                } if hasattr(rs, 'disclosure_text') and rs.disclosure_text else None
-            }
+        review_summary = _review_summary_to_dict(response_pb)
+        if review_summary:
+            details['reviewSummary'] = review_summary
 
         return details if details else None
 
     except Exception as e:
-        error_str = str(e)
-        if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-            print(f"\nRate limit hit for place {place_id}, waiting {SLEEP_TIME} seconds...")
-            await asyncio.sleep(SLEEP_TIME)
+        if is_rate_limit_error(e):
+            print(f"\nRate limit hit for place {place_id} after {RATE_LIMIT_MAX_ATTEMPTS} attempts, details rate now {DETAILS_LIMITER.rate:.1f}/s")
         else:
             print(f"\nError getting place details for {place_id}: {e}")
         return None
@@ -534,43 +862,53 @@ async def get_place_details_async(
 
 async def process_cell_async(
     client: places_v1.PlacesAsyncClient,
-    cell: GridCell,
-    semaphore: asyncio.Semaphore
-) -> Tuple[List[Dict], bool, bool]:
-    """Process a single grid cell asynchronously."""
-    async with semaphore:
-        # Check cache (returns None only if file doesn't exist, [] if empty cache exists)
-        cached_results = load_grid_cache(cell)
-        if cached_results is not None:
-            # Cache exists (even if empty), return cached results
-            return cached_results, True, False
-        
-        # Search for restaurants by type (more comprehensive than text query)
-        # Include multiple restaurant-related types to catch all variations
-        restaurant_types = [
-            "restaurant",
-        ]
-        results = await search_by_type_async(
-            client=client,
-            included_types=restaurant_types,
-            cell=cell
-        )
-
-        # Log how many results we got
-        if results:
-            limit_msg = " (hit 60 limit)" if len(results) >= 60 else ""
-            print(f"  Cell {cell.cache_filename()}: Got {len(results)} results from API{limit_msg}")
-        else:
-            print(f"  Cell {cell.cache_filename()}: No results from API")
-
-        # Always save to cache, even if empty (to avoid re-querying)
-        # Deduplication will happen later when aggregating all results
-        save_grid_cache(cell, results)
-        return results, False, True
+    cell: GridCell
+) -> Tuple[List[Dict], bool, bool, bool]:
+    """Process a single grid cell asynchronously.
 
+    Returns (results, from_cache, made_api_call, saturated), where saturated
+    means the search came back full and the cell is worth subdividing.
+    """
+    # Check cache (returns None only if file doesn't exist, [] if empty cache exists)
+    cached = await load_grid_cache(cell)
+    if cached is not None:
+        # Cache exists (even if empty), return cached results
+        cached_results, unfiltered = cached
+        return cached_results, True, False, unfiltered and is_saturated(cached_results)
+    
+    # Search for restaurants by type (more comprehensive than text query)
+    # Include multiple restaurant-related types to catch all variations
+    restaurant_types = [
+        "restaurant",
+    ]
+    results = await search_by_type_async(
+        client=client,
+        included_types=restaurant_types,
+        cell=cell
+    )
+
+    # Log how many results we got
+    if results:
+        limit_msg = " (hit 60 limit)" if len(results) >= 60 else ""
+        print(f"  Cell {cell.cache_filename()}: Got {len(results)} results from API{limit_msg}")
+    else:
+        print(f"  Cell {cell.cache_filename()}: No results from API")
+
+    # Always save to cache, even if empty (to avoid re-querying)
+    # Deduplication will happen later when aggregating all results
+    await save_grid_cache(cell, results)
+    return results, False, True, is_saturated(results)
+
+
+async def scrape_grid_cells_async(
+    client: places_v1.PlacesAsyncClient,
+    enrich_queue: Optional[asyncio.Queue] = None
+) -> Dict[str, Dict]:
+    """Phase 1: Scrape restaurants using grid strategy with parallelization.
 
-async def scrape_grid_cells_async(client: places_v1.PlacesAsyncClient) -> Dict[str, Dict]:
-    """Phase 1: Scrape restaurants using grid strategy with parallelization."""
+    If enrich_queue is given, each newly found restaurant is put on it as a
+    (place_id, restaurant) pair so Phase 2 can start before Phase 1 finishes.
+    """
     print("Phase 1: Grid-based Text Search (Parallelized)")
     print("=" * 50)
 
@@ -579,75 +917,146 @@ async def scrape_grid_cells_async(client: places_v1.PlacesAsyncClient) -> Dict[s
     cache_hits = 0
     api_calls = 0
     limit_hits = 0
-    filtered_count = 0
-
-    # Create semaphore to limit concurrent requests
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GRID_SEARCHES)
-
-    # Process all cells concurrently
-    tasks = [
-        process_cell_async(client, cell, semaphore)
-        for cell in cells
-    ]
-
-    # Use tqdm for progress tracking
-    results_list = []
-    for coro in tqdm.as_completed(tasks, desc="Processing grid cells", total=len(tasks)):
-        results, from_cache, made_api_call = await coro
+    subdivided = 0
+
+    # MAX_CONCURRENT_GRID_SEARCHES workers pull cells from a shared queue, so
+    # only that many cell coroutines exist at once instead of one per cell.
+    # Sub-cells of saturated cells go on the same queue
+    remaining_cells: asyncio.Queue = asyncio.Queue()
+    for cell in cells:
+        remaining_cells.put_nowait(cell)
+    # disable=None turns the bar off when output is not a terminal (logs, CI)
+    progress = tqdm(desc="Processing grid cells", total=len(cells), disable=None)
+
+    async def worker():
+        # A failing cell is logged and skipped; a worker that exited instead
+        # would leave remaining_cells.join() waiting forever
+        while True:
+            cell = await remaining_cells.get()
+            try:
+                await handle_cell(cell)
+            except Exception as e:
+                print(f"\n⚠️  Error processing cell {cell.cache_filename()}: {e}")
+                progress.update(1)
+            finally:
+                remaining_cells.task_done()
+
+    async def handle_cell(cell: GridCell):
+        nonlocal cache_hits, api_calls, limit_hits, subdivided
+        results, from_cache, made_api_call, saturated = await process_cell_async(client, cell)
         if from_cache:
             cache_hits += 1
         if made_api_call:
             api_calls += 1
         if len(results) >= 60:
             limit_hits += 1
-        results_list.append(results)
-
-    # Aggregate results and filter to only Manhattan restaurants using polygon check
-    # Note: Results are already filtered to only include restaurants with websiteUri
-    for results in results_list:
+        if GRID_REFINE and cell.depth < GRID_REFINE_MAX_DEPTH and saturated:
+            sub_cells = subdivide_cell(cell)
+            subdivided += 1
+            progress.total += len(sub_cells)
+            progress.refresh()
+            for sub_cell in sub_cells:
+                remaining_cells.put_nowait(sub_cell)
+
+        # Deduplicate as cells complete, so only unique restaurants are kept
+        # (overlapping search circles return the same places many times).
+        # Only restaurants with a websiteUri are kept
         for result in results:
             if 'id' in result:
-                # Double-check websiteUri exists (should already be filtered, but verify)
-                if result.get('websiteUri') or result.get('website_uri'):
+                # The first copy of a place is kept, since it's the dict that
+                # Phase 2 enriches in place
+                if (result.get('websiteUri') or result.get('website_uri')) and result['id'] not in all_restaurants:
                     all_restaurants[result['id']] = result
+                    if enrich_queue is not None:
+                        await enrich_queue.put((result['id'], result))
+        progress.update(1)
+
+    # Workers run until the queue (including any sub-cells) is drained
+    workers = [asyncio.create_task(worker()) for _ in range(MAX_CONCURRENT_GRID_SEARCHES)]
+    try:
+        await remaining_cells.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        progress.close()
 
     print(f"\nGrid search complete:")
     print(f"  Cache hits: {cache_hits}")
     print(f"  API calls: {api_calls}")
     print(f"  Cells hitting 60 result limit: {limit_hits}")
+    print(f"  Cells subdivided: {subdivided}")
     print(f"  Unique restaurants found: {len(all_restaurants)}")
 
     return all_restaurants
 
 
+def _chain_key(restaurant: Dict) -> Optional[Tuple[str, str]]:
+    """Key grouping chain locations: normalized name plus website (host without www. + path).
+
+    None for places without a name or website, or whose website is on a
+    GENERIC_WEBSITE_HOSTS host.
+    """
+    uri = restaurant.get('websiteUri') or restaurant.get('website_uri')
+    display_name = restaurant.get('displayName')
+    name = display_name.get('text') if isinstance(display_name, dict) else display_name
+    if not uri or not name:
+        return None
+    parts = urlsplit(uri)
+    host = parts.netloc.lower().removeprefix('www.')
+    if any(host == generic or host.endswith('.' + generic) for generic in GENERIC_WEBSITE_HOSTS):
+        return None
+    return ' '.join(name.lower().split()), f"{host}{parts.path.rstrip('/').lower()}"
+
+
 async def enrich_restaurant_async(
     client: places_v1.PlacesAsyncClient,
     place_id: str,
     restaurant: Dict,
-    semaphore: asyncio.Semaphore
-) -> Tuple[bool, bool]:
-    """Enrich a single restaurant asynchronously."""
-    async with semaphore:
-        # Check cache (returns None only if file doesn't exist, {} if empty cache exists)
-        cached_details = load_details_cache(place_id)
-        if cached_details is not None:
-            # Cache exists (even if empty), use cached details
-            if cached_details:  # Only update if not empty
-                restaurant.update(cached_details)
-            return True, False
-        
-        # Fetch details
-        details = await get_place_details_async(client, place_id)
-        # Always save to cache, even if None (to avoid re-querying)
-        save_details_cache(place_id, details)
-        if details:
-            restaurant.update(details)
-            # Small delay to avoid rate limits
-            await asyncio.sleep(DETAILS_DELAY)
-            return False, True
-        
-        # No details found, but cached empty result
-        return False, True
+    chain_details: Optional[Dict[Tuple[str, str], asyncio.Future]] = None
+) -> Tuple[bool, bool, bool]:
+    """Enrich a single restaurant asynchronously.
+
+    Returns (from_cache, made_api_call, shared). If chain_details is given,
+    only the first location seen for each chain (see _chain_key) fetches
+    CHAIN_SHARED_KEYS; later ones fetch only their own fields and copy the
+    shared keys from that fetch.
+    """
+    # Check cache (returns None only if file doesn't exist, {} if empty cache exists)
+    cached_details = await load_details_cache(place_id)
+    if cached_details is not None:
+        # Cache exists (even if empty), use cached details
+        if cached_details:  # Only update if not empty
+            restaurant.update(cached_details)
+        return True, False, False
+    
+    chain_key = _chain_key(restaurant) if chain_details is not None else None
+    first_location = None
+    fields = PLACE_DETAILS_FIELDS
+    if chain_key is not None:
+        if chain_key in chain_details:
+            first_location = chain_details[chain_key]
+            fields = CHAIN_LOCATION_DETAILS_FIELDS
+            chain_key = None
+        else:
+            chain_details[chain_key] = asyncio.get_running_loop().create_future()
+    
+    # Fetch details
+    details = None
+    try:
+        details = await get_place_details_async(client, place_id, fields)
+    finally:
+        if chain_key is not None:
+            chain_details[chain_key].set_result(details)
+    if first_location is not None:
+        shared = _pick(await first_location or {}, CHAIN_SHARED_KEYS)
+        if shared:
+            details = {**(details or {}), **shared}
+    # Always save to cache, even if None (to avoid re-querying)
+    await save_details_cache(place_id, details)
+    if details:
+        restaurant.update(details)
+    return False, True, first_location is not None
 
 
 async def enrich_restaurants_async(
@@ -658,52 +1067,105 @@ async def enrich_restaurants_async(
     print("\nPhase 2: Place Details Enrichment (Parallelized)")
     print("=" * 50)
 
+    queue = asyncio.Queue()
+    for item in restaurants.items():
+        queue.put_nowait(item)
+    queue.put_nowait(None)
+    await enrich_from_queue_async(client, queue, total=len(restaurants))
+
+
+async def enrich_from_queue_async(
+    client: places_v1.PlacesAsyncClient,
+    queue: asyncio.Queue,
+    total: Optional[int] = None
+):
+    """Phase 2 workers: enrich (place_id, restaurant) pairs taken from a queue.
+
+    Runs MAX_CONCURRENT_DETAILS workers until a None sentinel arrives, so it
+    can consume restaurants while Phase 1 is still producing them.
+    """
     cache_hits = 0
     api_calls = 0
     enriched_count = 0
 
-    # Create semaphore to limit concurrent requests
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DETAILS)
-
-    # Process all restaurants concurrently
-    tasks = [
-        enrich_restaurant_async(client, place_id, restaurant, semaphore)
-        for place_id, restaurant in restaurants.items()
-    ]
-
     # Use tqdm for progress tracking
-    for coro in tqdm.as_completed(tasks, desc="Enriching restaurants", total=len(tasks)):
-        from_cache, made_api_call = await coro
-        if from_cache:
-            cache_hits += 1
-        if made_api_call:
-            api_calls += 1
-            enriched_count += 1
-        elif not from_cache:
-            enriched_count += 1
+    progress = tqdm(desc="Enriching restaurants", total=total, disable=None)
+    # In-flight or finished details fetch per chain (see enrich_restaurant_async)
+    chain_details = {} if SHARE_CHAIN_DETAILS else None
+    shared_count = 0
+
+    async def worker():
+        nonlocal cache_hits, api_calls, enriched_count, shared_count
+        while (item := await queue.get()) is not None:
+            place_id, restaurant = item
+            from_cache, made_api_call, shared = await enrich_restaurant_async(client, place_id, restaurant, chain_details)
+            if from_cache:
+                cache_hits += 1
+            if made_api_call:
+                api_calls += 1
+                enriched_count += 1
+            if shared:
+                shared_count += 1
+            progress.update(1)
+        # Pass the sentinel on so every worker stops
+        await queue.put(None)
+
+    await asyncio.gather(*[worker() for _ in range(MAX_CONCURRENT_DETAILS)])
+    progress.close()
 
     print(f"\nEnrichment complete:")
     print(f"  Cache hits: {cache_hits}")
     print(f"  API calls: {api_calls}")
     print(f"  Enriched restaurants: {enriched_count}")
+    print(f"  Chain summaries copied from another location: {shared_count}")
 
 
 def save_output(restaurants: Dict[str, Dict]):
     """Save final output to JSON file."""
     print(f"\nSaving output to {OUTPUT_FILE}...")
 
-    output = {
+    header = orjson.dumps({
         "total_count": len(restaurants),
         "scraped_at": datetime.utcnow().isoformat() + "Z",
-        "restaurants": list(restaurants.values())
-    }
-
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    })
+
+    # Same document as before ({"total_count", "scraped_at", "restaurants": [...]}),
+    # but written one restaurant per line instead of serialized as one buffer.
+    # orjson writes UTF-8 directly (same as ensure_ascii=False)
+    with open(OUTPUT_FILE, 'wb') as f:
+        f.write(header[:-1] + b',"restaurants":[')
+        for i, restaurant in enumerate(restaurants.values()):
+            f.write(b'\n' if i == 0 else b',\n')
+            f.write(orjson.dumps(restaurant))
+        f.write(b'\n]}\n')
 
     print(f"Saved {len(restaurants)} restaurants to {OUTPUT_FILE}")
 
 
+def save_output_parquet(restaurants: Dict[str, Dict]):
+    """Save the restaurants as a zstd-compressed Parquet file, if pyarrow is available."""
+    if not OUTPUT_PARQUET_FILE:
+        return
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed, skipping Parquet output (pip install pyarrow)")
+        return
+
+    print(f"Saving Parquet output to {OUTPUT_PARQUET_FILE}...")
+    try:
+        # pa.array infers one struct type across all rows (places missing a
+        # field get nulls), with nested structs for location/summaries and
+        # list<struct> for reviews; repeated strings are dictionary-encoded
+        rows = pa.array(list(restaurants.values()))
+        table = pa.Table.from_batches([pa.RecordBatch.from_struct_array(rows)])
+        pq.write_table(table, OUTPUT_PARQUET_FILE, compression="zstd")
+        print(f"Saved {table.num_rows} restaurants to {OUTPUT_PARQUET_FILE}")
+    except Exception as e:
+        print(f"⚠️  Could not write Parquet output: {e}")
+
+
 async def main_async():
     """Main execution function (async)."""
     print("Manhattan Restaurants Scraper (Parallelized)")
@@ -713,15 +1175,25 @@ async def main_async():
     api_key = load_env()
     create_directories()
     client = create_async_client(api_key)
+    await warm_up_client(client)
 
-    # Phase 1: Grid search (parallelized)
-    restaurants = await scrape_grid_cells_async(client)
-
-    # Phase 2: Enrichment (parallelized)
-    await enrich_restaurants_async(client, restaurants)
+    # Phase 1: Grid search and Phase 2: Enrichment, pipelined - each restaurant
+    # is enriched as soon as the grid search finds it
+    enrich_queue = asyncio.Queue(maxsize=ENRICH_QUEUE_SIZE)
+    enrichment = asyncio.create_task(enrich_from_queue_async(client, enrich_queue))
+    try:
+        try:
+            restaurants = await scrape_grid_cells_async(client, enrich_queue)
+        finally:
+            await enrich_queue.put(None)
+        await enrichment
+    finally:
+        # Write whatever is still buffered, even if a phase failed
+        await flush_cache_writes()
 
     # Save output
     save_output(restaurants)
+    save_output_parquet(restaurants)
 
     print("\nDone!")
 
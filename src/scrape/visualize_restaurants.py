@@ -2,32 +2,69 @@
 """
 Create a static map visualization of all scraped restaurant locations.
 """
-import json
+import atexit
 import sys
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterable, Iterator, List, Tuple, Optional
+import numpy as np
+import ijson
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster
 from playwright.sync_api import sync_playwright
-import time
 
 from scrape_restaurants import _get_manhattan_polygon
 
-def load_restaurants(json_file: str) -> List[dict]:
-    """Load restaurants from JSON file."""
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    if isinstance(data, dict) and 'restaurants' in data:
-        return data['restaurants']
-    elif isinstance(data, list):
-        return data
-    else:
-        raise ValueError("Unexpected JSON structure")
+# True once Leaflet has drawn at least one tile and has none still loading
+TILES_LOADED_JS = (
+    "document.querySelectorAll('.leaflet-tile-loaded').length > 0"
+    " && !document.querySelector('.leaflet-tile-loading')"
+)
+TILE_LOAD_TIMEOUT_MS = 15000
+SCREENSHOT_JPEG_QUALITY = 85
+
+# Builds each restaurant marker in the browser from a [lat, lon, name] row, with
+# the same style, tooltip and popup as folium.CircleMarker would. The name is
+# set as text, not HTML
+MARKER_CALLBACK_JS = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: 'red', fill: true, fillColor: 'red', fillOpacity: 0.7, weight: 2
+    });
+    var label = document.createElement('b');
+    label.textContent = row[2];
+    marker.bindPopup(label, {maxWidth: 300});
+    marker.bindTooltip(row[2]);
+    return marker;
+}
+"""
+
+# Rows added to the coordinate array each time extract_locations runs out of room
+LOCATION_CHUNK_SIZE = 4096
 
-def extract_locations(restaurants: List[dict]) -> List[Tuple[float, float, str]]:
-    """Extract (lat, lon, name) tuples from restaurants."""
-    locations = []
+def load_restaurants(json_file: str) -> Iterator[dict]:
+    """
+    Stream restaurants from a JSON file, one at a time.
+    
+    Accepts the scraper's {"restaurants": [...]} output or a bare list. Only
+    one restaurant (with its reviews) is held in memory at a time.
+    """
+    with open(json_file, 'rb') as f:
+        head = f.read(1024).lstrip()
+        f.seek(0)
+        if head.startswith(b'{'):
+            prefix = 'restaurants.item'
+        elif head.startswith(b'['):
+            prefix = 'item'
+        else:
+            raise ValueError("Unexpected JSON structure")
+        yield from ijson.items(f, prefix, use_float=True)
+
+def extract_locations(restaurants: Iterable[dict]) -> Tuple[np.ndarray, List[str]]:
+    """Extract an (N, 2) lat/lon array and the matching list of names from restaurants."""
+    chunks = []
+    chunk = np.empty((LOCATION_CHUNK_SIZE, 2), dtype=np.float64)
+    filled = 0
+    names = []
     for restaurant in restaurants:
         if 'location' in restaurant and restaurant['location']:
             lat = restaurant['location'].get('latitude')
@@ -35,19 +72,25 @@ def extract_locations(restaurants: List[dict]) -> List[Tuple[float, float, str]]
             name = restaurant.get('displayName', {}).get('text', 'Unknown')
             
             if lat is not None and lon is not None:
-                locations.append((lat, lon, name))
+                if filled == LOCATION_CHUNK_SIZE:
+                    chunks.append(chunk)
+                    chunk = np.empty((LOCATION_CHUNK_SIZE, 2), dtype=np.float64)
+                    filled = 0
+                chunk[filled] = (lat, lon)
+                filled += 1
+                names.append(name)
     
-    return locations
+    chunks.append(chunk[:filled])
+    return np.concatenate(chunks), names
 
-def create_map(locations: List[Tuple[float, float, str]], output_html: str = "restaurants_map.html"):
+def create_map(coords: np.ndarray, names: List[str], output_html: str = "restaurants_map.html"):
     """Create an interactive Folium map."""
-    if not locations:
+    if not names:
         print("No locations found!")
         return None
     
     # Calculate center point
-    avg_lat = sum(lat for lat, _, _ in locations) / len(locations)
-    avg_lon = sum(lon for _, lon, _ in locations) / len(locations)
+    avg_lat, avg_lon = coords.mean(axis=0).tolist()
     
     # Create map centered on Manhattan
     m = folium.Map(
@@ -61,7 +104,7 @@ def create_map(locations: List[Tuple[float, float, str]], output_html: str = "re
         polygon = _get_manhattan_polygon()
         # Convert polygon coordinates to folium format (lat, lon)
         # Shapely polygon uses (lon, lat), folium needs (lat, lon)
-        polygon_coords = [[lat, lon] for lon, lat in polygon.exterior.coords]
+        polygon_coords = np.asarray(polygon.exterior.coords)[:, ::-1].tolist()
         folium.Polygon(
             locations=polygon_coords,
             color='blue',
@@ -76,52 +119,81 @@ def create_map(locations: List[Tuple[float, float, str]], output_html: str = "re
     except Exception as e:
         print(f"⚠️  Could not add Manhattan polygon to map: {e}")
     
-    # Add marker cluster for better performance with many markers
-    marker_cluster = MarkerCluster().add_to(m)
-    
-    # Add markers with restaurant names
-    for lat, lon, name in locations:
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=5,
-            popup=folium.Popup(
-                f"<b>{name}</b>",
-                max_width=300,
-                parse_html=True
-            ),
-            tooltip=name,
-            color='red',
-            fill=True,
-            fillColor='red',
-            fillOpacity=0.7,
-            weight=2
-        ).add_to(marker_cluster)
+    # Markers are built client-side from one [lat, lon, name] array instead of
+    # one folium object (and block of generated JS) per restaurant
+    data = [[lat, lon, name] for (lat, lon), name in zip(coords.tolist(), names)]
+    FastMarkerCluster(data=data, callback=MARKER_CALLBACK_JS).add_to(m)
     
     # Save HTML map
     m.save(output_html)
     print(f"✅ Created interactive map: {output_html}")
     return m
 
+class _BrowserPool:
+    """Headless Chromium shared by every render, launched on first use and closed at exit."""
+    _playwright = None
+    _browser = None
+    
+    @classmethod
+    def acquire_page(cls, width: int, height: int):
+        """Open a page in a fresh context; close it with page.context.close()."""
+        if cls._browser is None:
+            cls._playwright = sync_playwright().start()
+            cls._browser = cls._playwright.chromium.launch(headless=True)
+            atexit.register(cls.close)
+        context = cls._browser.new_context(viewport={'width': width, 'height': height})
+        return context.new_page()
+    
+    @classmethod
+    def close(cls):
+        """Shut down the browser and Playwright, if started."""
+        if cls._browser is not None:
+            cls._browser.close()
+            cls._playwright.stop()
+            cls._browser = None
+            cls._playwright = None
+
 def render_map_to_image(html_file: str, output_image: str = "restaurants_map.png", width: int = 1920, height: int = 1080):
     """Render HTML map to static image using Playwright."""
-    print(f"Rendering map to image: {output_image}...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={'width': width, 'height': height})
-        
-        # Load the HTML file
-        html_path = Path(html_file).absolute()
-        page.goto(f'file://{html_path}')
-        
-        # Wait for map to load
-        time.sleep(3)
-        
-        # Take screenshot
-        page.screenshot(path=output_image, full_page=False)
-        browser.close()
-    
-    print(f"✅ Created static map image: {output_image}")
+    render_maps_to_images([(html_file, output_image)], width, height)
+
+def render_maps_to_images(pairs: List[Tuple[str, str]], width: int = 1920, height: int = 1080, concurrency: int = 4):
+    """
+    Render several HTML maps to static images, up to `concurrency` at a time.
+    
+    Sync Playwright objects can only be used from the thread that created
+    them, so instead of worker threads each batch opens one context per map
+    in the shared browser and starts every navigation before waiting on any:
+    Chromium loads the batch's tiles in parallel.
+    """
+    for start in range(0, len(pairs), concurrency):
+        batch = pairs[start:start + concurrency]
+        # Reuses one Chromium process across renders; only the context is per render
+        pages = []
+        try:
+            for html_file, output_image in batch:
+                print(f"Rendering map to image: {output_image}...")
+                page = _BrowserPool.acquire_page(width, height)
+                pages.append(page)
+                # Load the HTML file
+                html_path = Path(html_file).absolute()
+                page.goto(f'file://{html_path}', wait_until='domcontentloaded')
+            
+            for page, (_, output_image) in zip(pages, batch):
+                # Wait for map to load: screenshot as soon as Leaflet has finished the
+                # visible tiles instead of after a fixed delay
+                page.wait_for_function(TILES_LOADED_JS, timeout=TILE_LOAD_TIMEOUT_MS)
+                
+                # Take screenshot (JPEG outputs are encoded by Chromium at
+                # SCREENSHOT_JPEG_QUALITY, much faster than PNG for a full map)
+                if Path(output_image).suffix.lower() in ('.jpg', '.jpeg'):
+                    page.screenshot(path=output_image, full_page=False, type='jpeg', quality=SCREENSHOT_JPEG_QUALITY)
+                else:
+                    page.screenshot(path=output_image, full_page=False)
+                print(f"✅ Created static map image: {output_image}")
+        finally:
+            for page in pages:
+                page.context.close()
 
 def main():
     """Main function."""
@@ -141,7 +213,7 @@ def main():
     parser.add_argument(
         '--output-image',
         default='restaurants_map.png',
-        help='Output static image file'
+        help='Output static image file (.jpg/.jpeg renders faster than .png)'
     )
     parser.add_argument(
         '--html-only',
@@ -163,22 +235,18 @@ def main():
     
     args = parser.parse_args()
     
-    # Load restaurants
+    # Load restaurants and extract locations (streamed, one restaurant at a time)
     print(f"Loading restaurants from {args.input}...")
-    restaurants = load_restaurants(args.input)
-    print(f"Loaded {len(restaurants)} restaurants")
-    
-    # Extract locations
-    locations = extract_locations(restaurants)
-    print(f"Found {len(locations)} restaurants with valid locations")
+    coords, names = extract_locations(load_restaurants(args.input))
+    print(f"Found {len(names)} restaurants with valid locations")
     
-    if not locations:
+    if not names:
         print("No valid locations found!")
         sys.exit(1)
     
     # Create map
     print("Creating map...")
-    create_map(locations, args.output_html)
+    create_map(coords, names, args.output_html)
     
     # Render to image if requested
     if not args.html_only: